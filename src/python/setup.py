@@ -41,6 +41,12 @@ setup(
         "gitpython",
         "pythonnet",
     ],
+    extras_require={
+        # Vectorised dependency roll-ups for views over large projects
+        "sparse": ["numpy", "scipy"],
+        # Faster encoding of the compact JSON format
+        "fastjson": ["orjson"],
+    },
     classifiers=[
         "Programming Language :: Python :: 3.10",
         "Programming Language :: Python :: 3.9",
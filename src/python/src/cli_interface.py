@@ -2,37 +2,48 @@ import subprocess
 import typer
 import json
 import os
-import requests
-import jsonschema
+import posixpath
 import tempfile
 import shutil
 import sys
+from functools import lru_cache, partial
 from pathlib import Path
-from src.providers.json.json_render import save_json, save_json_diff
-from src.providers.plantuml.pu_render import save_plant_uml, save_plant_uml_diff
-from src.utils.path_manager_singleton import PathManagerSingleton
+from typing import TYPE_CHECKING, Callable
 
 # from src.utils.functions import verify_config_options
-from src.utils.config_manager_singleton import ConfigManagerSingleton
-
-from src.views.view_manager import render_views, render_diff_views
-
-from src.core.bt_graph import BTGraph
-
-from src.git_integration.fetch_git import fetch_git_repo
-
-from astroid.manager import AstroidManager
-
-import astroid
-
-astroid.MANAGER = None
+from src.utils.run_context import RunContext
+
+from src.core.import_extraction import ImportEngine
+from src.providers.json.json_format import JsonFormat
+from src.utils.memory_report import MemoryReport
+
+# astroid, git, requests, jsonschema and the renderers are slow to import, so they are
+# imported by the commands that use them. `archlens --help` and `init` stay fast.
+if TYPE_CHECKING:
+    from src.core.bt_graph import BTGraph
+    from src.core.parse_cache import ParseCache
+    from src.core.source_tree import SourceTree
+    from src.git_integration.git_tree import GitTree
+    from src.providers.json.json_bundle import JsonBundle
+    from src.providers.output_manifest import OutputManifest
+    from src.providers.plantuml.pu_server import PlantUMLRenderer
 
 app = typer.Typer(add_completion=True)
 
 
 @app.command()
-def render(config_path: str = "./archlens.json"):
+def render(
+    config_path: str = "./archlens.json",
+    cache_dir: str = None,
+    import_engine: ImportEngine = None,
+    jobs: int = None,
+    low_memory: bool = False,
+    memory_report: bool = False,
+    view_jobs: int = None,
+    save_snapshot: bool = False,
+):
     config = read_config_file(config_path)
+    _apply_cli_options(config, import_engine, jobs, low_memory, view_jobs)
 
     if (should_run_dotnet(config)):
         Program = _init_dotnet()
@@ -42,31 +53,55 @@ def render(config_path: str = "./archlens.json"):
         assert_result(result)
 
         if format == "puml":
-            for view in config["views"]:
-                file_name = os.getcwd() + config["saveLocPure"] + config["name"] + f"-{view}.puml"
-                python_executable = sys.executable
-                plantuml_server = os.getenv(
-                    "PLANTUML_SERVER_URL",
-                    "https://www.plantuml.com/plantuml/img/",
-                )
-                os.system(
-                    f"{python_executable} -m plantuml --server {plantuml_server}  {file_name}"
-                )
+            _render_plantuml_files(
+                config,
+                [
+                    os.getcwd() + config["saveLocPure"] + config["name"] + f"-{view}.puml"
+                    for view in config["views"]
+                ],
+                cache_dir,
+            )
 
     else:
-        mt_path_manager = PathManagerSingleton()
-        mt_path_manager.setup(config)
-
-        am = _create_astroid()
-        g = BTGraph(am)
-        g.build_graph(config)
-
-        render_views(g, config, save_plant_uml)
+        from src.providers.plantuml.pu_render import save_plant_uml
+        from src.views.view_manager import render_views
+
+        context = RunContext.from_config(config)
+
+        parse_cache = _create_parse_cache(config, cache_dir)
+        report = MemoryReport(memory_report)
+        g = _build_graph(config, parse_cache, report)
+        _save_parse_cache(parse_cache)
+        if save_snapshot:
+            _save_head_snapshot(g, config, cache_dir)
+
+        renderer = _create_plantuml_renderer(config, cache_dir)
+        manifest = _create_output_manifest(config)
+        with report.phase("views"):
+            render_views(
+                g,
+                config,
+                partial(save_plant_uml, renderer=renderer, manifest=manifest),
+                context,
+            )
+            renderer.render()
+        _save_output_manifest(manifest)
 
 
 @app.command()
-def render_json(config_path: str = "./archlens.json"):
+def render_json(
+    config_path: str = "./archlens.json",
+    cache_dir: str = None,
+    import_engine: ImportEngine = None,
+    jobs: int = None,
+    low_memory: bool = False,
+    memory_report: bool = False,
+    view_jobs: int = None,
+    json_format: JsonFormat = None,
+    save_snapshot: bool = False,
+):
     config = read_config_file(config_path)
+    _apply_cli_options(config, import_engine, jobs, low_memory, view_jobs, json_format)
 
     if (should_run_dotnet(config)):
         Program = _init_dotnet()
@@ -74,25 +109,272 @@ def render_json(config_path: str = "./archlens.json"):
         result = Program.CLISync(config_path, "json")
         assert_result(result)
     else:
-        mt_path_manager = PathManagerSingleton()
-        mt_path_manager.setup(config)
+        from src.providers.json.json_render import save_json
+        from src.views.view_manager import render_views
+
+        context = RunContext.from_config(config)
 
-        am = _create_astroid()
-        g = BTGraph(am)
-        g.build_graph(config)
+        parse_cache = _create_parse_cache(config, cache_dir)
+        report = MemoryReport(memory_report)
+        g = _build_graph(config, parse_cache, report)
+        _save_parse_cache(parse_cache)
+        if save_snapshot:
+            _save_head_snapshot(g, config, cache_dir)
 
-        render_views(g, config, save_json)
+        manifest = _create_output_manifest(config)
+        save_view, bundle = _json_saver(config, save_json, manifest)
+        with report.phase("views"):
+            render_views(g, config, save_view, context)
+            if bundle is not None:
+                bundle.save(list(config["views"]), manifest)
+        _save_output_manifest(manifest)
+
+
+@app.command()
+def export_graph(
+    config_path: str = "./archlens.json",
+    output: str = None,
+    cache_dir: str = None,
+    import_engine: ImportEngine = None,
+    jobs: int = None,
+    low_memory: bool = False,
+    memory_report: bool = False,
+):
+    """
+    Exports the package and file graph of a Python project to a SQLite database (`.sqlite`,
+    `.sqlite3`, `.db`) or NumPy arrays (`.npz`), `<saveLocation>/<name>-graph.sqlite` by default
+    """
+    config = read_config_file(config_path)
+    _apply_cli_options(config, import_engine, jobs, low_memory)
+    if should_run_dotnet(config):
+        raise Exception("export-graph only supports Python projects")
+
+    from src.providers.graph_export import check_export_path, export_graph as export
+
+    output = output or os.path.join(config["saveLocation"], f"{config['name']}-graph.sqlite")
+    check_export_path(output)
+
+    parse_cache = _create_parse_cache(config, cache_dir)
+    report = MemoryReport(memory_report)
+    g = _build_graph(config, parse_cache, report)
+    _save_parse_cache(parse_cache)
+
+    with report.phase("export"):
+        export(g, output)
+    print(f"Exported the graph to {output}")
 
 
 def _create_astroid():
+    import astroid
+    from astroid.manager import AstroidManager
+
+    astroid.MANAGER = None
     am = AstroidManager()
     am.brain["astroid_cache"] = {}
     return am
 
 
+def _build_graph(
+    config: dict,
+    parse_cache: "ParseCache",
+    memory_report: MemoryReport,
+    source_tree: "SourceTree" = None,
+) -> "BTGraph":
+    from src.core.bt_graph import BTGraph
+
+    am = _create_astroid()
+    graph = BTGraph(am, parse_cache, source_tree)
+    graph.memory_report = memory_report
+    graph.build_graph(config)
+    return graph
+
+
+def _open_base_tree(
+    config_path: str, config: dict, tmp_dir: str, cache_dir: str = None
+) -> tuple[dict, "GitTree"]:
+    """
+    Config and source tree of the `github.branch` to diff against. The tree is read from git
+    objects, its files get paths below :param tmp_dir: but are never written there.
+    With a cache dir the branch is kept in a mirror there between runs.
+    """
+    from src.git_integration.fetch_git import fetch_base_revision
+    from src.git_integration.git_tree import GitTree
+
+    repo, revision, config_folder = fetch_base_revision(
+        config, tmp_dir, _resolve_cache_dir(config, cache_dir)
+    )
+    tree_root = os.path.join(tmp_dir, "base")
+
+    config_git = read_config_file(config_path)
+    config_git["_config_path"] = os.path.normpath(os.path.join(tree_root, config_folder))
+    root_folder = posixpath.normpath(posixpath.join(config_folder, config_git["rootFolder"]))
+    return config_git, GitTree(repo, revision, tree_root, root_folder)
+
+
+def _snapshot_folder(config: dict, cache_dir: str = None) -> str:
+    """Snapshots are kept in the cache dir, or in the `snapshotDir` of the project"""
+    from src.core.graph_snapshot import SNAPSHOTS_FOLDER
+
+    cache_dir = _resolve_cache_dir(config, cache_dir)
+    if cache_dir:
+        return os.path.join(cache_dir, SNAPSHOTS_FOLDER)
+    return os.path.join(config["_config_path"], config.get("snapshotDir", ".archlens"))
+
+
+def _save_graph_snapshot(graph: "BTGraph", config: dict, revision: str, cache_dir: str = None):
+    from src.core.graph_snapshot import create_snapshot, save_snapshot
+
+    snapshot = create_snapshot(graph, revision, config)
+    save_snapshot(
+        snapshot, _snapshot_folder(config, cache_dir), config.get("snapshotFile", "snapshot")
+    )
+
+
+def _save_head_snapshot(graph: "BTGraph", config: dict, cache_dir: str = None):
+    """Saves :param graph: as the snapshot of the checked out commit, see `render-diff`"""
+    from src.git_integration.fetch_git import clean_head_revision
+
+    revision = clean_head_revision(config)
+    if revision is None:
+        print("No snapshot saved: the root folder is not a clean checkout of a commit")
+        return
+    _save_graph_snapshot(graph, config, revision, cache_dir)
+    print(f"Saved the snapshot of {revision}")
+
+
+def _load_base_snapshot(
+    config: dict,
+    config_git: dict,
+    base_tree: "GitTree",
+    memory_report: MemoryReport,
+    cache_dir: str = None,
+) -> "BTGraph":
+    """
+    The graph of the branch to diff against, restored from the snapshot of its commit.
+    None if there is no snapshot of the commit, then the graph is built from the tree.
+    """
+    from src.core.bt_graph import BTGraph
+    from src.core.graph_snapshot import load_snapshot, matches_tree
+
+    snapshot = load_snapshot(
+        _snapshot_folder(config, cache_dir),
+        config.get("snapshotFile", "snapshot"),
+        base_tree.revision,
+        config,
+    )
+    root_folder = os.path.join(config_git["_config_path"], config_git["rootFolder"])
+    if snapshot is None or not matches_tree(snapshot, base_tree, root_folder):
+        return None
+
+    print(f"Using the snapshot of {base_tree.revision}")
+    graph = BTGraph(_create_astroid(), source_tree=base_tree)
+    graph.memory_report = memory_report
+    with memory_report.phase("snapshot"):
+        graph.load_snapshot(config_git, snapshot)
+    return graph
+
+
+def _create_plantuml_renderer(config: dict, cache_dir: str = None) -> "PlantUMLRenderer":
+    """Renders the PlantUML views of a run at once, caching images in the cache dir"""
+    from src.providers.plantuml.pu_server import PlantUMLRenderer
+
+    return PlantUMLRenderer(cache_dir=_resolve_cache_dir(config, cache_dir))
+
+
+def _create_output_manifest(config: dict) -> "OutputManifest":
+    from src.providers.output_manifest import OutputManifest
+
+    return OutputManifest(config["saveLocation"])
+
+
+def _json_saver(
+    config: dict, save: Callable, manifest: "OutputManifest", diff: bool = False
+) -> tuple[Callable, "JsonBundle"]:
+    """
+    What saves the JSON views of a run. With the `bundle` format the views are collected in
+    the returned bundle instead, which is saved once all views are.
+    """
+    if JsonFormat(config.get("jsonFormat", "standard")) != JsonFormat.BUNDLE:
+        return partial(save, manifest=manifest), None
+
+    from src.providers.json.json_bundle import create_json_bundle
+
+    bundle = create_json_bundle(config, diff)
+    return bundle.add_view, bundle
+
+
+def _save_output_manifest(manifest: "OutputManifest"):
+    """Keeps the hashes of the outputs for the next run, and reports which views changed"""
+    manifest.save()
+    manifest.report()
+
+
+def _render_plantuml_files(config: dict, file_names: list[str], cache_dir: str = None):
+    """Renders the `.puml` files the .NET engine saved"""
+    renderer = _create_plantuml_renderer(config, cache_dir)
+    for file_name in file_names:
+        if not os.path.exists(file_name):
+            print(f"Could not render {file_name}: the file does not exist")
+            continue
+        with open(file_name, "r") as f:
+            renderer.add(file_name, f.read())
+    renderer.render()
+
+
+def _apply_cli_options(
+    config: dict,
+    import_engine: ImportEngine = None,
+    jobs: int = None,
+    low_memory: bool = False,
+    view_jobs: int = None,
+    json_format: JsonFormat = None,
+):
+    """Command line options override the matching config fields"""
+    if import_engine:
+        config["importEngine"] = import_engine.value
+    if jobs is not None:
+        config["jobs"] = jobs
+    if low_memory:
+        config["lowMemory"] = True
+    if view_jobs is not None:
+        config["viewJobs"] = view_jobs
+    if json_format:
+        config["jsonFormat"] = json_format.value
+
+
+def _resolve_cache_dir(config: dict, cache_dir: str = None) -> str:
+    """The --cache-dir option wins over the cacheDir config field, None if neither is set"""
+    if cache_dir:
+        return os.path.abspath(cache_dir)
+    if config.get("cacheDir"):
+        return os.path.join(config["_config_path"], config["cacheDir"])
+    return None
+
+
+def _create_parse_cache(config: dict, cache_dir: str = None) -> "ParseCache":
+    from src.core.parse_cache import ParseCache
+
+    cache_dir = _resolve_cache_dir(config, cache_dir)
+    return ParseCache(cache_dir) if cache_dir else None
+
+
+def _save_parse_cache(parse_cache: "ParseCache"):
+    if parse_cache:
+        parse_cache.save()
+
+
 @app.command()
-def render_diff(config_path: str = "archlens.json"):
+def render_diff(
+    config_path: str = "archlens.json",
+    cache_dir: str = None,
+    import_engine: ImportEngine = None,
+    jobs: int = None,
+    low_memory: bool = False,
+    memory_report: bool = False,
+    view_jobs: int = None,
+):
     config = read_config_file(config_path)
+    _apply_cli_options(config, import_engine, jobs, low_memory, view_jobs)
 
     if (should_run_dotnet(config)):
         Program = _init_dotnet()
@@ -102,41 +384,57 @@ def render_diff(config_path: str = "archlens.json"):
         assert_result(result)
 
         if format == "puml":
-            for view in config["views"]:
-                file_name = os.getcwd() + config["saveLocPure"] + config["name"] + f"-diff-{view}.puml"
-                python_executable = sys.executable
-                plantuml_server = os.getenv(
-                    "PLANTUML_SERVER_URL",
-                    "https://www.plantuml.com/plantuml/img/",
-                )
-                os.system(
-                    f"{python_executable} -m plantuml --server {plantuml_server}  {file_name}"
-                )
+            _render_plantuml_files(
+                config,
+                [
+                    os.getcwd() + config["saveLocPure"] + config["name"] + f"-diff-{view}.puml"
+                    for view in config["views"]
+                ],
+                cache_dir,
+            )
 
     else:
+        from src.views.view_manager import render_diff_views
+
         with tempfile.TemporaryDirectory() as tmp_dir:
             print("Created temporary directory:", tmp_dir)
 
-            fetch_git_repo(tmp_dir, config["github"]["url"], config["github"]["branch"])
+            config_git, base_tree = _open_base_tree(config_path, config, tmp_dir, cache_dir)
+            _apply_cli_options(config_git, import_engine, jobs, low_memory, view_jobs)
 
-            shutil.copyfile(config_path, os.path.join(tmp_dir, "archlens.json"))
+            context = RunContext.from_config(config, config_git)
 
-            config_git = read_config_file(os.path.join(tmp_dir, "archlens.json"))
+            # Both graphs share one cache, files that are equal on both branches are only parsed once
+            parse_cache = _create_parse_cache(config, cache_dir)
+            report = MemoryReport(memory_report)
 
-            path_manager = PathManagerSingleton()
-            path_manager.setup(config, config_git)
-
-            local_am = _create_astroid()
-            local_graph = BTGraph(local_am)
-            local_graph.build_graph(config)
+            local_graph = _build_graph(config, parse_cache, report)
             # verify_config_options(config, g)
 
-            remote_am = _create_astroid()
-            remote_graph = BTGraph(remote_am)
-            remote_graph.build_graph(config_git)
-            # verify_config_options(config_git, g_git)
-
-            changed_views = render_diff_views(local_graph, remote_graph, config, save_plant_uml_diff)
+            remote_graph = _load_base_snapshot(
+                config, config_git, base_tree, report, cache_dir
+            )
+            if remote_graph is None:
+                remote_graph = _build_graph(config_git, parse_cache, report, base_tree)
+                # verify_config_options(config_git, g_git)
+                _save_graph_snapshot(remote_graph, config, base_tree.revision, cache_dir)
+
+            _save_parse_cache(parse_cache)
+
+            from src.providers.plantuml.pu_render import save_plant_uml_diff
+
+            renderer = _create_plantuml_renderer(config, cache_dir)
+            manifest = _create_output_manifest(config)
+            with report.phase("views"):
+                changed_views = render_diff_views(
+                    local_graph,
+                    remote_graph,
+                    config,
+                    partial(save_plant_uml_diff, renderer=renderer, manifest=manifest),
+                    context,
+                )
+                renderer.render()
+            _save_output_manifest(manifest)
 
             # Output marker for GitHub Actions to detect which views have architectural changes
             if changed_views:
@@ -145,8 +443,18 @@ def render_diff(config_path: str = "archlens.json"):
 
 
 @app.command()
-def render_diff_json(config_path: str = "archlens.json"):
+def render_diff_json(
+    config_path: str = "archlens.json",
+    cache_dir: str = None,
+    import_engine: ImportEngine = None,
+    jobs: int = None,
+    low_memory: bool = False,
+    memory_report: bool = False,
+    view_jobs: int = None,
+    json_format: JsonFormat = None,
+):
     config = read_config_file(config_path)
+    _apply_cli_options(config, import_engine, jobs, low_memory, view_jobs, json_format)
 
     if (should_run_dotnet(config)):
         Program = _init_dotnet()
@@ -154,29 +462,44 @@ def render_diff_json(config_path: str = "archlens.json"):
         result = Program.CLISync(config_path, "json", True)
         assert_result(result)
     else:
+        from src.views.view_manager import render_diff_views
+
         with tempfile.TemporaryDirectory() as tmp_dir:
             print("Created temporary directory:", tmp_dir)
 
-            fetch_git_repo(tmp_dir, config["github"]["url"], config["github"]["branch"])
-
-            shutil.copyfile(config_path, os.path.join(tmp_dir, "archlens.json"))
+            config_git, base_tree = _open_base_tree(config_path, config, tmp_dir, cache_dir)
+            _apply_cli_options(
+                config_git, import_engine, jobs, low_memory, view_jobs, json_format
+            )
 
-            config_git = read_config_file(os.path.join(tmp_dir, "archlens.json"))
+            context = RunContext.from_config(config, config_git)
 
-            path_manager = PathManagerSingleton()
-            path_manager.setup(config, config_git)
+            # Both graphs share one cache, files that are equal on both branches are only parsed once
+            parse_cache = _create_parse_cache(config, cache_dir)
+            report = MemoryReport(memory_report)
 
-            local_am = _create_astroid()
-            local_graph = BTGraph(local_am)
-            local_graph.build_graph(config)
+            local_graph = _build_graph(config, parse_cache, report)
             # verify_config_options(config, g)
 
-            remote_am = _create_astroid()
-            remote_graph = BTGraph(remote_am)
-            remote_graph.build_graph(config_git)
-            # verify_config_options(config_git, g_git)
+            remote_graph = _load_base_snapshot(
+                config, config_git, base_tree, report, cache_dir
+            )
+            if remote_graph is None:
+                remote_graph = _build_graph(config_git, parse_cache, report, base_tree)
+                # verify_config_options(config_git, g_git)
+                _save_graph_snapshot(remote_graph, config, base_tree.revision, cache_dir)
 
-            render_diff_views(local_graph, remote_graph, config, save_json_diff)
+            _save_parse_cache(parse_cache)
+
+            from src.providers.json.json_render import save_json_diff
+
+            manifest = _create_output_manifest(config)
+            save_view, bundle = _json_saver(config, save_json_diff, manifest, diff=True)
+            with report.phase("views"):
+                render_diff_views(local_graph, remote_graph, config, save_view, context)
+                if bundle is not None:
+                    bundle.save(list(config["views"]), manifest)
+            _save_output_manifest(manifest)
 
 
 @app.command()
@@ -194,6 +517,8 @@ def init(config_path="./archlens.json"):
 
 @app.command()
 def create_action():
+    import requests
+
     action_url = "https://raw.githubusercontent.com/archlens/ArchLens/master/.github/workflows/render-diff-on-pr.yml"
     action_path = Path(".github/workflows/render-diff-on-pr.yml")
     typer.secho(f"Creating the action at {action_path}", fg="green")
@@ -209,13 +534,8 @@ def read_config_file(config_path):
     with open(config_path, "r") as f:
         config = json.load(f)
 
-    config_schema = None
-    schema_path = os.path.join(os.path.dirname(__file__), "config.schema.json")
-    with open(schema_path) as fp:
-        config_schema = json.load(fp)
-
     if not os.getenv("MT_DEBUG"):
-        jsonschema.validate(instance=config, schema=config_schema)
+        _validate_config(config)
 
     config["saveLocPure"] = config["saveLocation"]
 
@@ -225,11 +545,30 @@ def read_config_file(config_path):
         os.path.join(config["_config_path"], config["saveLocation"])
     )
 
-    config_manager = ConfigManagerSingleton()
-    config_manager.setup(config)
-
     return config
 
+def _validate_config(config: dict):
+    import jsonschema
+
+    error = jsonschema.exceptions.best_match(_config_validator().iter_errors(config))
+    if error is not None:
+        raise error
+
+
+@lru_cache(maxsize=None)
+def _config_validator():
+    """Validator for config.schema.json, the schema is only loaded and checked once per process"""
+    import jsonschema
+
+    schema_path = os.path.join(os.path.dirname(__file__), "config.schema.json")
+    with open(schema_path) as fp:
+        config_schema = json.load(fp)
+
+    validator_class = jsonschema.validators.validator_for(config_schema)
+    validator_class.check_schema(config_schema)
+    return validator_class(config_schema)
+
+
 def _init_dotnet():
     """Load the .NET runtime and return the Archlens Program class."""
     # Auto-detect DOTNET_ROOT on macOS Homebrew
@@ -0,0 +1,57 @@
+from array import array
+
+from src.core.bt_module import BTModule
+
+
+class AncestorIndex:
+    """
+    Euler tour over a forest of modules.
+
+    Every module gets the interval [enter, leave) of tour positions covered by its subtree,
+    so a module is an ancestor of another when the other's enter position falls inside its
+    interval. Modules are referred to by their position in :param modules:, the parent of a
+    module only counts when it is in :param modules: as well.
+    """
+
+    def __init__(self, modules: list[BTModule]) -> None:
+        positions = {module: position for position, module in enumerate(modules)}
+        self.parents = array(
+            "i", [positions.get(module.parent_module, -1) for module in modules]
+        )
+        self.enter = array("i", [0] * len(modules))
+        self.leave = array("i", [0] * len(modules))
+        # Module positions in the order the tour enters them (parents before children)
+        self.tour = array("i")
+
+        for root in [
+            position for position, parent in enumerate(self.parents) if parent < 0
+        ]:
+            stack = [(root, False)]
+            while stack:
+                position, leaving = stack.pop()
+                if leaving:
+                    self.leave[position] = len(self.tour)
+                    continue
+                self.enter[position] = len(self.tour)
+                self.tour.append(position)
+                stack.append((position, True))
+                for child in reversed(modules[position].child_module):
+                    if child in positions:
+                        stack.append((positions[child], False))
+
+    def nearest_marked(self, marked: set[int]) -> array:
+        """
+        For every module, the position of the nearest module in :param marked: that is the
+        module itself or one of its parents, -1 if there is none. One sweep over the tour.
+        """
+        nearest = array("i", [-1] * len(self.parents))
+        open_marked: list[int] = []
+        for position in self.tour:
+            enter = self.enter[position]
+            while open_marked and self.leave[open_marked[-1]] <= enter:
+                open_marked.pop()
+            if position in marked:
+                open_marked.append(position)
+            if open_marked:
+                nearest[position] = open_marked[-1]
+        return nearest
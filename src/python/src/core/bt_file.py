@@ -1,95 +1,93 @@
 import astroid
 from astroid.manager import AstroidManager
 
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Sequence
 
 if TYPE_CHECKING:
     from src.core.bt_module import BTModule
+    from src.core.dependency_store import DependencyStore
 
 
 class BTFile:
-    label: str = ""
-    edge_to: list["BTFile"] = None
-    ast = None
-    module: "BTModule" = None
-    am: AstroidManager
+    __slots__ = ("label", "module", "am", "id", "_path", "_ast", "_store")
 
-    def __init__(self, label: str, module, am: AstroidManager, code_path: str = None):
+    label: str
+    module: "BTModule"
+    am: AstroidManager
+    # Id of the file in the DependencyStore of its graph, None until it is added to one
+    id: int
+
+    def __init__(
+        self,
+        label: str,
+        module,
+        am: AstroidManager,
+        code_path: str = None,
+        path: str = None,
+    ):
         self.label = label
-        self.ast = None
         self.am = am
+        self._path = path
+        self._ast = None
+        self.id = None
+        self._store: "DependencyStore" = None
 
         if code_path is not None:
-            self.ast: astroid.Module = self.am.ast_from_module_name(code_path)
+            self._ast: astroid.Module = self.am.ast_from_module_name(code_path)
 
-        self.edge_to = []
         self.module = module
 
+    @property
+    def ast(self) -> astroid.Module:
+        # The tree is only built when somebody asks for it, so files whose
+        # imports come from the parse cache are never parsed.
+        if self._ast is None and self._path is not None:
+            self._ast = self.am.ast_from_file(self._path)
+        return self._ast
+
+    @ast.setter
+    def ast(self, value: astroid.Module):
+        self._ast = value
+
+    @property
+    def edge_ids(self) -> Sequence[int]:
+        """Ids of the files this file depends on, iterating them does not create any objects"""
+        if self._store is None:
+            return ()
+        return self._store.targets(self.id)
+
+    @property
+    def edge_to(self) -> list["BTFile"]:
+        if self._store is None:
+            return []
+        files = self._store.files
+        return [files[target] for target in self.edge_ids]
+
     @property
     def file(self):
-        if self.ast:
-            return self.ast.file
+        if self._path is not None:
+            return self._path
+        if self._ast:
+            return self._ast.file
         return ""
 
     @property
     def uid(self):
-        if self.ast:
-            return self.ast.file
+        if self.file:
+            return self.file
         else:
             return self.label
 
     @property
     def module_path(self) -> str:
-        if not self.ast:
+        if not self.file:
             return None
         return "/".join(self.file.split("/")[:-1])
 
     def __rshift__(self, other):
+        if self._store is None:
+            raise Exception(f"{self.uid} is not part of a graph")
         if isinstance(other, list):
-            existing_edges = set(
-                [edge.file for edge in self.edge_to if edge.file != ""]
-            )
-            new_node_list = filter(lambda e: e.file not in existing_edges, other)
-            self.edge_to.extend([node for node in new_node_list])
+            self._store.add_edges(self.id, [node.id for node in other])
         else:
-            edges = set([edge.file for edge in self.edge_to])
-            if other.file in edges:
-                return
-
-            self.edge_to.append(other)
-
-
-def get_imported_modules(
-    ast: astroid.Module, root_location: str, am: AstroidManager
-) -> list:
-    imported_modules = []
-    for sub_node in ast.body:
-        try:
-            if isinstance(sub_node, astroid.node_classes.ImportFrom):
-                sub_node: astroid.node_classes.ImportFrom = sub_node
-
-                module_node = am.ast_from_module_name(
-                    sub_node.modname,
-                    context_file=root_location,
-                )
-                imported_modules.append(module_node)
-
-            elif isinstance(sub_node, astroid.node_classes.Import):
-                for name, _ in sub_node.names:
-                    try:
-                        module_node = am.ast_from_module_name(
-                            name,
-                            context_file=root_location,
-                        )
-                        imported_modules.append(module_node)
-                    except Exception:
-                        continue
-            elif hasattr(sub_node, "body"):
-                imported_modules.extend(
-                    get_imported_modules(sub_node, root_location, am)
-                )
-
-        except astroid.AstroidImportError:
-            continue
-
-    return imported_modules
+            self._store.add_edges(self.id, [other.id])
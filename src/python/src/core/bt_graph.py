@@ -3,9 +3,30 @@ import json
 import astroid
 import sys
 import os
+from contextlib import contextmanager
 
-from src.core.bt_file import BTFile, get_imported_modules
+from src.core.bt_file import BTFile
 from src.core.bt_module import BTModule
+from src.core.dependency_extractor import (
+    DependencyExtractor,
+    FileDependencies,
+    default_job_count,
+    extract_in_parallel,
+)
+from src.core.dependency_store import DependencyStore
+from src.core.file_discovery import (
+    DiscoveredPackage,
+    ExclusionRules,
+    compile_exclusions,
+    discover_packages,
+    is_excluded,
+)
+from src.core.graph_snapshot import GraphSnapshot, restored_folder
+from src.core.import_extraction import ImportEngine
+from src.core.import_resolver import ImportResolver
+from src.core.parse_cache import ParseCache
+from src.core.source_tree import SourceTree
+from src.utils.memory_report import MemoryReport
 from astroid.manager import AstroidManager
 
 
@@ -16,100 +37,434 @@ class BTGraph:
     root_module = None
     base_module = None
     am: AstroidManager = None
+    parse_cache: ParseCache = None
+    import_engine: ImportEngine = ImportEngine.ASTROID
+    jobs: int = 1
+    resolver: ImportResolver = None
+    dependencies: DependencyStore = None
+    exclusions: ExclusionRules = None
+    low_memory: bool = False
+    memory_report: MemoryReport = None
+    source_tree: SourceTree = None
 
-    def __init__(self, am: AstroidManager) -> None:
+    def __init__(
+        self, am: AstroidManager, parse_cache: ParseCache = None, source_tree: SourceTree = None
+    ) -> None:
         self.am = am
+        self.parse_cache = parse_cache
+        self.source_tree = source_tree or SourceTree()
+        # file -> (name, level) of its imports that did not resolve to a project file
+        self._unresolved_imports: dict[str, list[tuple[str, int]]] = {}
+        self.dependencies = DependencyStore()
+        self.memory_report = MemoryReport()
+
+        # Indexes over every module and file below base_module, kept up to date by
+        # build_graph and apply_changes
+        self._modules_by_path: dict[str, BTModule] = {}  # normalised path -> module
+        self._modules_by_name: dict[str, BTModule] = {}  # dotted name below base_module -> module
+        self._files_by_path: dict[str, BTFile] = {}
+        # (files map, modules map) of the current scope, see change_scope
+        self._scope_maps: tuple[dict[str, BTFile], dict[str, BTModule]] = None
 
     def build_graph(self, config: dict):
+        self._configure(config)
+
+        with self._project_sys_path():
+            self._build_modules_and_dependencies()
+
+        astroid.manager.AstroidManager().clear_cache()
+        self.am.clear_cache()
+
+    def load_snapshot(self, config: dict, snapshot: GraphSnapshot):
+        """
+        Restores the graph :param snapshot: was taken of, below the root folder of
+        :param config:, instead of building it from the sources. Nothing is parsed.
+        The imports that did not resolve are not part of a snapshot, so `apply_changes` only
+        finds the dependencies on added files for the files it analyses itself.
+        """
+        self._configure(config)
+        self.dependencies = DependencyStore()
+
+        packages = [
+            DiscoveredPackage(
+                os.path.join(restored_folder(self.root_module_location, folder), "__init__.py"),
+                [],
+            )
+            for folder in snapshot.modules
+        ]
+        bt_module_list = self._create_modules(packages)
+        bt_file_list = [
+            bt_module_list[module].add_file(name) for module, name, _ in snapshot.files
+        ]
+
+        self.root_module = bt_module_list[0]
+        self.base_module = self.root_module
+        self._index_subtree(self.base_module)
+        self.resolver = ImportResolver(
+            [self.target_project_base_location, self.root_module_location],
+            list(self._files_by_path),
+        )
+        for bt_file, targets in zip(bt_file_list, snapshot.edges):
+            bt_file >> [bt_file_list[target] for target in targets]
+        self.dependencies.freeze()
+
+    def _configure(self, config: dict):
         config_path = config.get("_config_path")
         self.root_module_location = os.path.join(config_path, config.get("rootFolder"))
         self.target_project_base_location = config_path
+        self.import_engine = ImportEngine(config.get("importEngine", "astroid"))
+        self.jobs = config.get("jobs", 1) or default_job_count()
+        self.exclusions = compile_exclusions(config.get("exclusions", []))
+        self.low_memory = config.get("lowMemory", False)
 
-        sys.path.insert(0, config_path)
-        sys.path.insert(1, self.root_module_location)
+    def _build_modules_and_dependencies(self):
+        self.dependencies = DependencyStore()
 
-        bt_module_list: list[BTModule] = []
+        # Find the packages of the project, skipping excluded and non package folders
+        with self.memory_report.phase("discovery"):
+            discovery = discover_packages(
+                self.root_module_location,
+                self.target_project_base_location,
+                self.exclusions,
+                self.source_tree,
+            )
+            print(f"discovery: {len(discovery.packages)} packages, {discovery.skipped} entries skipped")
+            bt_module_list = self._create_modules(discovery.packages)
+
+        # Find the root node
+        self.root_module = next(
+            filter(lambda e: e.parent_module is None, bt_module_list)
+        )
+        self.base_module = self.root_module
+        self._index_subtree(self.base_module)
+
+        # Add dependencies between all the files
+        btf_map = self._files_by_path
+
+        # Modules are imported relative to the project folder and the root folder, in that order
+        self.resolver = ImportResolver(
+            [self.target_project_base_location, self.root_module_location], list(btf_map)
+        )
+        with self.memory_report.phase("dependencies"):
+            dependencies = self._extract_dependencies(btf_map, list(btf_map))
+            for bt_file in btf_map.values():
+                bt_file >> [btf_map[target] for target in dependencies[bt_file.file]]
+            self.dependencies.freeze()
+
+        if self.parse_cache:
+            print(
+                f"parse cache: {self.parse_cache.hits} hits, {self.parse_cache.misses} misses"
+            )
+
+    def apply_changes(
+        self,
+        added: list[str] = None,
+        modified: list[str] = None,
+        deleted: list[str] = None,
+    ) -> list[str]:
+        """
+        Updates the graph in place after files were added, modified or deleted, instead of building it again.
+        Only the changed files, the files that depended on deleted files and the files with imports that
+        may now resolve to an added file are analysed again.
+        Adding or deleting an `__init__.py` adds or removes the package (with its sub packages).
+
+        :return: the files whose dependencies were extracted again
+        :raises ValueError: when the `__init__.py` of the root package is deleted
+        """
+        added = [os.path.abspath(path) for path in added or []]
+        modified = [os.path.abspath(path) for path in modified or []]
+        deleted = [os.path.abspath(path) for path in deleted or []]
+
+        with self._project_sys_path():
+            removed_files = self._remove_deleted_files(deleted)
+            new_files = self._add_new_files(added)
+            self._scope_maps = None
+
+            btf_map = self._files_by_path
+            for removed_file in removed_files:
+                self._unresolved_imports.pop(removed_file.file, None)
+                self.resolver.remove_file(removed_file.file)
+            for new_file in new_files:
+                self.resolver.add_file(new_file.file)
+
+            affected_files = {bt_file.file for bt_file in new_files}
+            for path in modified:
+                bt_file = btf_map.get(self.resolver.project_file(path))
+                if bt_file is not None:
+                    bt_file.ast = None
+                    affected_files.add(bt_file.file)
+            removed_ids = {removed_file.id for removed_file in removed_files}
+            for bt_file in btf_map.values():
+                if any(target in removed_ids for target in bt_file.edge_ids):
+                    affected_files.add(bt_file.file)
+            if new_files:
+                for path, unresolved in self._unresolved_imports.items():
+                    if self._resolves_into_project(path, unresolved):
+                        affected_files.add(path)
+
+            affected_files = [path for path in btf_map if path in affected_files]
+            dependencies = self._extract_dependencies(btf_map, affected_files)
+            for path in affected_files:
+                bt_file = btf_map[path]
+                self.dependencies.clear_edges(bt_file.id)
+                bt_file >> [btf_map[target] for target in dependencies[path]]
+            self.dependencies.freeze()
+
+        self.am.clear_cache()
+        return affected_files
+
+    def _remove_deleted_files(self, deleted: list[str]) -> set[BTFile]:
+        removed_files: set[BTFile] = set()
+        for path in deleted:
+            module = self._modules_by_path.get(os.path.normpath(os.path.dirname(path)))
+            if module is None:
+                continue
+
+            if os.path.basename(path) == "__init__.py":
+                if module is self.base_module:
+                    raise ValueError(
+                        "The root package was deleted, the graph has to be built again"
+                    )
+                removed_files.update(module.get_files_recursive())
+                self._unindex_subtree(module)
+                module.parent_module.child_module.remove(module)
+                module.parent_module = None
+                if self._modules_by_path.get(os.path.normpath(self.root_module.path)) is not self.root_module:
+                    self.root_module = self.base_module
+                continue
 
-        # Read all the python files within the project
-        file_list = self._get_files_recursive(self.root_module_location)
+            for bt_file in module.file_list:
+                if os.path.normpath(bt_file.file) == os.path.normpath(path):
+                    module.file_list.remove(bt_file)
+                    self._files_by_path.pop(bt_file.file)
+                    self.dependencies.remove_file(bt_file)
+                    removed_files.add(bt_file)
+                    break
+        return removed_files
+
+    def _add_new_files(self, added: list[str]) -> list[BTFile]:
+        new_files: list[BTFile] = []
+        for path in added:
+            if is_excluded(os.path.relpath(path, self.target_project_base_location), self.exclusions):
+                continue
+            directory = os.path.normpath(os.path.dirname(path))
+            module = self._modules_by_path.get(directory)
+
+            if os.path.basename(path) == "__init__.py" and module is None:
+                parent_module = self._modules_by_path.get(os.path.dirname(directory))
+                if parent_module is not None:
+                    bt_module = self._add_package(path, parent_module)
+                    self._index_subtree(bt_module)
+                    new_files.extend(bt_module.get_files_recursive())
+                continue
+
+            if module is None or any(
+                os.path.normpath(bt_file.file) == os.path.normpath(path)
+                for bt_file in module.file_list
+            ):
+                continue
+            bt_file = module.add_file(os.path.basename(path))
+            if bt_file is not None:
+                self._files_by_path[bt_file.file] = bt_file
+                self.dependencies.add_file(bt_file)
+                new_files.append(bt_file)
+        return new_files
 
-        # Create modules and add them to module list (No relations between them yet)
-        for file in file_list:
+    def _create_modules(self, packages: list[DiscoveredPackage]) -> list[BTModule]:
+        """Creates a module per package and links them to their parent modules"""
+        bt_module_list: list[BTModule] = []
+        for package in packages:
             try:
-                if not file.endswith("__init__.py"):
-                    continue
-                bt_module = BTModule(file, self.am)
-                bt_module.add_files()
+                bt_module = BTModule(package.init_file, self.am)
+                bt_module.add_files(package.files)
                 bt_module_list.append(bt_module)
             except Exception as e:
                 print(e)
                 continue
 
         # Add relations between the modules (parent and child nodes)
+        modules_by_path = {module.path: module for module in bt_module_list}
         for module in bt_module_list:
-            for parent_module in bt_module_list:
-                if module == parent_module:
-                    continue
-                if parent_module.path == os.path.dirname(module.path):
-                    parent_module.child_module.append(module)
-                    module.parent_module = parent_module
+            parent_module = modules_by_path.get(os.path.dirname(module.path))
+            if parent_module is not None and parent_module is not module:
+                parent_module.child_module.append(module)
+                module.parent_module = parent_module
+        return bt_module_list
 
-        # Find the root node
-        self.root_module = next(
-            filter(lambda e: e.parent_module is None, bt_module_list)
+    def _add_package(self, init_file: str, parent_module: BTModule) -> BTModule:
+        """Adds the package of :param init_file: and the packages below it"""
+        discovery = discover_packages(
+            os.path.dirname(init_file),
+            self.target_project_base_location,
+            self.exclusions,
+            self.source_tree,
         )
-        self.base_module = self.root_module
+        bt_module = self._create_modules(discovery.packages)[0]
+        parent_module.child_module.append(bt_module)
+        bt_module.parent_module = parent_module
+        return bt_module
 
-        # Add dependencies between all the files
-        btf_map = self.get_all_bt_files_map()
+    def _index_subtree(self, top_module: BTModule):
+        """
+        Adds :param top_module: and everything below it to the indexes and the dependency store,
+        and sets the depth of the modules
+        """
+        for module in [top_module, *top_module.get_submodules_recursive()]:
+            parent_module = module.parent_module
+            module.depth = 0 if module is self.base_module else parent_module.depth + 1
+            self._modules_by_path[os.path.normpath(module.path)] = module
+            self._modules_by_name[self._dotted_name(module)] = module
+            self.dependencies.add_module(module)
+            for bt_file in module.file_list:
+                self._files_by_path[bt_file.file] = bt_file
+                self.dependencies.add_file(bt_file)
+        self._scope_maps = None
+
+    def _unindex_subtree(self, top_module: BTModule):
+        for module in [top_module, *top_module.get_submodules_recursive()]:
+            self._modules_by_path.pop(os.path.normpath(module.path), None)
+            self._modules_by_name.pop(self._dotted_name(module), None)
+            self.dependencies.remove_module(module)
+            for bt_file in module.file_list:
+                self._files_by_path.pop(bt_file.file, None)
+                self.dependencies.remove_file(bt_file)
+        self._scope_maps = None
+
+    def _dotted_name(self, module: BTModule) -> str:
+        """Name of :param module: relative to base_module, e.g. `core.models`"""
+        relative_path = os.path.relpath(module.path, self.base_module.path)
+        return "" if relative_path == os.curdir else relative_path.replace(os.sep, ".")
+
+    @contextmanager
+    def _project_sys_path(self):
+        sys.path.insert(0, self.target_project_base_location)
+        sys.path.insert(1, self.root_module_location)
+        try:
+            yield
+        finally:
+            sys.path = sys.path[2:]
+
+    def _extract_dependencies(
+        self, btf_map: dict[str, BTFile], file_paths: list[str]
+    ) -> dict[str, list[str]]:
+        """Maps every file of :param file_paths: to the project files it imports"""
+        dependencies: dict[str, list[str]] = {}
+        cache_keys: dict[str, str] = {}
+
+        if self.parse_cache:
+            for file in file_paths:
+                key = ParseCache.key(self._to_relative_path(file), self.source_tree.read(file))
+                result = self._get_cached_dependencies(file, key)
+                if result is None:
+                    cache_keys[file] = key
+                else:
+                    dependencies[file] = result.targets
+                    self._unresolved_imports[file] = result.unresolved
+
+        pending_files = [file for file in file_paths if file not in dependencies]
+        for result in self._analyse_files(pending_files):
+            dependencies[result.file] = result.targets
+            self._unresolved_imports[result.file] = result.unresolved
+            if result.file in cache_keys:
+                self.parse_cache.put(
+                    cache_keys[result.file],
+                    [self._to_relative_path(target) for target in result.targets],
+                    result.unresolved,
+                )
+        return dependencies
 
-        for bt_file in btf_map.values():
-            imported_modules = get_imported_modules(
-                bt_file.ast, self.target_project_base_location, self.am
+    def _analyse_files(self, file_paths: list[str]) -> list[FileDependencies]:
+        if self.jobs > 1 and len(file_paths) > 1:
+            sources = None
+            if not self.source_tree.on_disk:
+                sources = [self.source_tree.read(file_path) for file_path in file_paths]
+            return extract_in_parallel(
+                file_paths,
+                self.jobs,
+                self.import_engine,
+                self.resolver,
+                self.low_memory,
+                sources,
             )
-            bt_file >> [
-                btf_map[module.file]
-                for module in imported_modules
-                if module.file in btf_map
+        extractor = DependencyExtractor(
+            self.am, self.import_engine, self.resolver, self.low_memory
+        )
+        if not self.source_tree.on_disk:
+            return [
+                extractor.extract(file_path, self.source_tree.read(file_path))
+                for file_path in file_paths
             ]
+        return [extractor.extract(file_path) for file_path in file_paths]
 
-        sys.path = sys.path[2:]
-        astroid.manager.AstroidManager().clear_cache()
-        self.am.clear_cache()
+    def _get_cached_dependencies(self, file: str, key: str) -> FileDependencies:
+        entry = self.parse_cache.get(key)
+        if entry is None:
+            return None
+
+        targets = [
+            self.resolver.project_file(self._to_absolute_path(target))
+            for target in entry["targets"]
+        ]
+        unresolved = [(name, level) for name, level in entry["unresolved"]]
+        if None in targets or self._resolves_into_project(file, unresolved):
+            # A target was removed or an unresolved import now points into the project
+            self.parse_cache.invalidate(key)
+            return None
+        return FileDependencies(file, targets, unresolved)
+
+    def _resolves_into_project(self, file: str, imports: list[tuple[str, int]]) -> bool:
+        package = os.path.dirname(file)
+        return any(
+            self.resolver.resolve(name, level, package) is not None
+            for name, level in imports
+        )
+
+    def _to_relative_path(self, path: str) -> str:
+        relative_path = os.path.relpath(path, self.target_project_base_location)
+        return relative_path.replace(os.sep, "/")
+
+    def _to_absolute_path(self, relative_path: str) -> str:
+        return os.path.join(self.target_project_base_location, relative_path)
 
     def get_bt_file(self, path: str) -> BTFile:
-        file_path = self.am.ast_from_module_name(path).file
+        file_path = self.resolver.resolve(path, 0, None)
         bt_file = self.get_all_bt_files_map()[file_path]
         return bt_file
 
     def get_bt_module(self, path: str) -> BTModule:
+        """
+        Module at the dotted :param path: in the current scope, the first part of the path
+        names the scope's root module, e.g. `app.core.models`
+        """
         path_list = path.split(".")[1:]
-        current_module = self.root_module
-        while path_list:
-            current_module = next(
-                filter(
-                    lambda e: e.name == path_list[0],
-                    current_module.child_module,
-                )
-            )
-            path_list.pop(0)
-        return current_module
+        name = ".".join(
+            part for part in [self._dotted_name(self.root_module), *path_list] if part
+        )
+        module = self._modules_by_name.get(name)
+        if module is None:
+            raise Exception(f"{path} package does not exist in project")
+        return module
 
     def change_scope(self, path: str):
         self.root_module = self.get_bt_module(path)
+        self._scope_maps = None
 
     def get_all_bt_files_map(self) -> dict[str, BTFile]:
-        return {btf.file: btf for btf in self.root_module.get_files_recursive()}
+        """All files of the current scope, the map is shared and must not be modified"""
+        return self._get_scope_maps()[0]
 
     def get_all_bt_modules_map(self) -> dict[str, BTModule]:
-        return {btm.path: btm for btm in self.root_module.get_submodules_recursive()}
-
-    def _get_files_recursive(self, path: str) -> list[str]:
-        file_list = []
-        t = list(os.walk(path))
-        for root, _, files in t:
-            for file in files:
-                file_list.append(os.path.join(root, file))
-
-        return file_list
+        """All modules below the root of the current scope, the map is shared and must not be modified"""
+        return self._get_scope_maps()[1]
 
+    def _get_scope_maps(self) -> tuple[dict[str, BTFile], dict[str, BTModule]]:
+        if self._scope_maps is None:
+            if self.root_module is self.base_module:
+                files = self._files_by_path
+            else:
+                files = {btf.file: btf for btf in self.root_module.get_files_recursive()}
+            modules = {
+                btm.path: btm for btm in self.root_module.get_submodules_recursive()
+            }
+            self._scope_maps = (files, modules)
+        return self._scope_maps
@@ -4,49 +4,82 @@ import os
 from src.core.bt_file import BTFile
 from astroid.manager import AstroidManager
 
+from typing import TYPE_CHECKING
 
-class BTModule:
-    parent_module: "BTModule" = None
-    child_module: list["BTModule"] = None
-
-    name_if_duplicate_exists = None
+if TYPE_CHECKING:
+    from src.core.dependency_store import DependencyStore
 
-    file_list: list["BTFile"] = None
 
-    ast: astroid.Module = None
-    am: AstroidManager = None
+class BTModule:
+    __slots__ = (
+        "parent_module",
+        "child_module",
+        "name_if_duplicate_exists",
+        "file_list",
+        "init_file",
+        "depth",
+        "am",
+        "id",
+        "_ast",
+        "_store",
+    )
+
+    parent_module: "BTModule"
+    child_module: list["BTModule"]
+
+    file_list: list["BTFile"]
+
+    init_file: str
+    # Number of parent modules, set by BTGraph when the module is linked into the graph
+    depth: int
+    am: AstroidManager
+    # Id of the module in the DependencyStore of its graph, None until it is added to one
+    id: int
 
     def __init__(self, file_path: str, am: AstroidManager) -> None:
-        self.ast = am.ast_from_file(file_path)
+        self.init_file = file_path
+        self._ast = None
+        self.parent_module = None
         self.child_module = []
+        self.name_if_duplicate_exists = None
         self.file_list = []
+        self.depth = 0
         self.am = am
+        self.id = None
+        self._store: "DependencyStore" = None
         print(f"analyzing {self.path}")
 
     @property
-    def depth(self):
-        parents = self.get_parent_module_recursive()
-        return len(parents)
+    def ast(self) -> astroid.Module:
+        if self._ast is None:
+            self._ast = self.am.ast_from_file(self.init_file)
+        return self._ast
 
     @property
     def name(self):
-        return self.ast.name.split(".")[-1]
+        return os.path.basename(self.path)
 
     @property
     def path(self):
-        return os.path.dirname(self.ast.file)
-
-    def add_files(self):
-        files = [
-            element for element in os.listdir(self.path) if element.endswith(".py")
-        ]
-
-        for file in files:
-            if file == "testing.py":
-                continue
-            bt_file = BTFile(label=file.split("/")[-1], module=self, am=self.am)
-            bt_file.ast = self.am.ast_from_file(os.path.join(self.path, file))
-            self.file_list.append(bt_file)
+        return os.path.dirname(self.init_file)
+
+    def add_files(self, files: list[str] = None):
+        """Adds the files named :param files:, all files of the package folder by default"""
+        for file in os.listdir(self.path) if files is None else files:
+            self.add_file(file)
+
+    def add_file(self, file: str) -> BTFile:
+        """Adds the file named :param file: in this package, returns None if it is not analysed"""
+        if not file.endswith(".py") or file == "testing.py":
+            return None
+        bt_file = BTFile(
+            label=file.split("/")[-1],
+            module=self,
+            am=self.am,
+            path=os.path.join(self.path, file),
+        )
+        self.file_list.append(bt_file)
+        return bt_file
 
     def get_files_recursive(self) -> list[BTFile]:
         temp_file_list = self.file_list.copy()
@@ -68,16 +101,24 @@ class BTModule:
         return parent_module_list
 
     def get_module_dependencies(self) -> set["BTModule"]:
-        dependencies = set()
-        for child in self.file_list:
-            dependencies.update(map(lambda e: e.module, child.edge_to))
-        return dependencies
+        if self._store is None:
+            return set()
+        file_module = self._store.file_module
+        module_ids = {
+            file_module[target] for child in self.file_list for target in child.edge_ids
+        }
+        return {self._store.modules[module_id] for module_id in module_ids}
 
     def get_dependency_count(self, other: "BTModule"):
-        file_dependencies = other.file_list
-        files = [edge for element in self.file_list for edge in element.edge_to]
-        count = len([element for element in files if element in file_dependencies])
-        return count
+        if self._store is None:
+            return 0
+        file_module = self._store.file_module
+        return sum(
+            1
+            for element in self.file_list
+            for target in element.edge_ids
+            if file_module[target] == other.id
+        )
 
     def get_file_level_relations(self, target_module: "BTModule"):
         """
@@ -85,15 +126,15 @@ class BTModule:
         :return:
         """
 
+        if self._store is None:
+            return []
+        files = self._store.files
+        file_module = self._store.file_module
+
         # relation is a tuple (file, file)
-        all_file_relations = [
-            (origin_file, target_file)
+        return [
+            (origin_file, files[target])
             for origin_file in self.file_list
-            for target_file in origin_file.edge_to
-        ]
-        relations = [
-            relation
-            for relation in all_file_relations
-            if relation[1] in target_module.file_list
+            for target in origin_file.edge_ids
+            if file_module[target] == target_module.id
         ]
-        return relations
@@ -0,0 +1,128 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from importlib.util import decode_source
+from typing import NamedTuple
+
+import astroid
+from astroid.manager import AstroidManager
+
+from src.core.import_extraction import (
+    ImportEngine,
+    ImportRecord,
+    extract_imports_from_astroid,
+    extract_imports_from_source,
+)
+from src.core.import_resolver import ImportResolver
+
+
+class FileDependencies(NamedTuple):
+    """Picklable result of analysing a single file"""
+
+    file: str
+    # Project files the file imports, in import order
+    targets: list[str]
+    # (name, level) of the imports that did not resolve to a project file
+    unresolved: list[tuple[str, int]]
+
+
+class DependencyExtractor:
+    am: AstroidManager = None
+    import_engine: ImportEngine = None
+    resolver: ImportResolver = None
+    # Drop every astroid tree from the manager's cache as soon as its imports are read
+    low_memory: bool = False
+
+    def __init__(
+        self,
+        am: AstroidManager,
+        import_engine: ImportEngine,
+        resolver: ImportResolver,
+        low_memory: bool = False,
+    ) -> None:
+        self.am = am
+        self.import_engine = import_engine
+        self.resolver = resolver
+        self.low_memory = low_memory
+
+    def extract(self, file_path: str, source: bytes = None) -> FileDependencies:
+        targets = []
+        unresolved = []
+        try:
+            records = self._extract_imports(file_path, source)
+        except (astroid.AstroidBuildingError, SyntaxError, ValueError) as e:
+            print(e)
+            return FileDependencies(file_path, targets, unresolved)
+
+        for record in records:
+            target = self.resolver.resolve_record(record, file_path)
+            if target is None:
+                unresolved.append((record.name, record.level))
+            elif target != file_path and target not in targets:
+                targets.append(target)
+        return FileDependencies(file_path, targets, unresolved)
+
+    def _extract_imports(
+        self, file_path: str, source: bytes = None
+    ) -> list[ImportRecord]:
+        if self.import_engine == ImportEngine.AST:
+            if source is None:
+                with open(file_path, "rb") as f:
+                    source = f.read()
+            return extract_imports_from_source(source, file_path)
+        if source is None:
+            module = self.am.ast_from_file(file_path)
+        else:
+            module = self.am.ast_from_string(decode_source(source), filepath=file_path)
+        records = extract_imports_from_astroid(module)
+        if self.low_memory:
+            self.am.astroid_cache.pop(module.name, None)
+        return records
+
+
+_worker_extractor: DependencyExtractor = None
+
+
+def _init_worker(
+    import_engine: ImportEngine, resolver: ImportResolver, low_memory: bool
+):
+    global _worker_extractor
+    am = AstroidManager()
+    am.brain["astroid_cache"] = {}
+    _worker_extractor = DependencyExtractor(am, import_engine, resolver, low_memory)
+
+
+def _extract_in_worker(file_path: str, source: bytes = None) -> FileDependencies:
+    return _worker_extractor.extract(file_path, source)
+
+
+def extract_in_parallel(
+    file_paths: list[str],
+    jobs: int,
+    import_engine: ImportEngine,
+    resolver: ImportResolver,
+    low_memory: bool = False,
+    sources: list[bytes] = None,
+) -> list[FileDependencies]:
+    """
+    Analyses :param file_paths: on a pool of :param jobs: processes.
+    Every worker has its own astroid manager, results come back in the order of :param file_paths:
+    The workers read the files themselves, unless their :param sources: are given.
+    """
+    chunk_size = max(1, len(file_paths) // (jobs * 4))
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_worker,
+        initargs=(import_engine, resolver, low_memory),
+    ) as pool:
+        return list(
+            pool.map(
+                _extract_in_worker,
+                file_paths,
+                sources or [None] * len(file_paths),
+                chunksize=chunk_size,
+            )
+        )
+
+
+def default_job_count() -> int:
+    return os.cpu_count() or 1
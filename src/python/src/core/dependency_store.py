@@ -0,0 +1,102 @@
+from array import array
+from typing import TYPE_CHECKING, Iterable, Sequence
+
+if TYPE_CHECKING:
+    from src.core.bt_file import BTFile
+    from src.core.bt_module import BTModule
+
+
+class DependencyStore:
+    """
+    File dependencies of a graph, stored by integer ids.
+
+    Every file and module gets a dense id when it is added. While the graph is being built
+    the edges of a file are kept in an array of target ids, deduplicated on insert.
+    `freeze` packs all rows into a single offsets/targets pair (CSR), so a built graph keeps
+    two flat arrays instead of a list of objects per file. Changing a frozen store unpacks
+    the rows again. Ids are never reused, the slots of removed files and modules are None.
+    """
+
+    def __init__(self) -> None:
+        self.files: list["BTFile"] = []
+        self.modules: list["BTModule"] = []
+        # file id -> id of the module containing the file
+        self.file_module = array("i")
+        self._rows: list[array] = []
+        self._offsets: array = None
+        self._targets: memoryview = None
+
+    @property
+    def frozen(self) -> bool:
+        return self._rows is None
+
+    @property
+    def edge_count(self) -> int:
+        if self.frozen:
+            return len(self._targets)
+        return sum(len(row) for row in self._rows)
+
+    def add_module(self, module: "BTModule") -> int:
+        module.id = len(self.modules)
+        module._store = self
+        self.modules.append(module)
+        return module.id
+
+    def remove_module(self, module: "BTModule"):
+        self.modules[module.id] = None
+
+    def add_file(self, bt_file: "BTFile") -> int:
+        self._thaw()
+        bt_file.id = len(self.files)
+        bt_file._store = self
+        self.files.append(bt_file)
+        self.file_module.append(bt_file.module.id)
+        self._rows.append(array("i"))
+        return bt_file.id
+
+    def remove_file(self, bt_file: "BTFile"):
+        """Removes the file and its own edges, edges pointing to it are left to the caller"""
+        self.clear_edges(bt_file.id)
+        self.files[bt_file.id] = None
+
+    def add_edges(self, source: int, targets: Iterable[int]):
+        self._thaw()
+        row = self._rows[source]
+        existing_targets = set(row)
+        for target in targets:
+            if target not in existing_targets:
+                existing_targets.add(target)
+                row.append(target)
+
+    def clear_edges(self, source: int):
+        self._thaw()
+        del self._rows[source][:]
+
+    def targets(self, source: int) -> Sequence[int]:
+        """Ids of the files :param source: depends on, in insertion order, without copying them"""
+        if self.frozen:
+            start, end = self._offsets[source], self._offsets[source + 1]
+            return self._targets[start:end]
+        return self._rows[source]
+
+    def freeze(self):
+        if self.frozen:
+            return
+        offsets = array("l", [0])
+        targets = array("i")
+        for row in self._rows:
+            targets.extend(row)
+            offsets.append(len(targets))
+        self._offsets = offsets
+        self._targets = memoryview(targets)
+        self._rows = None
+
+    def _thaw(self):
+        if not self.frozen:
+            return
+        self._rows = [
+            array("i", self._targets[start:end])
+            for start, end in zip(self._offsets, self._offsets[1:])
+        ]
+        self._offsets = None
+        self._targets = None
@@ -0,0 +1,145 @@
+import os
+from typing import TYPE_CHECKING, NamedTuple
+
+if TYPE_CHECKING:
+    from src.core.source_tree import SourceTree
+
+INIT_FILE = "__init__.py"
+
+
+class ExclusionRules(NamedTuple):
+    """The `exclusions` of the config, compiled the same way the .NET engine compiles them"""
+
+    # `build/` or `src/generated`, matched as a folder anywhere in the path
+    dir_prefixes: list[str]
+    # `.venv` or `*_generated`, matched against every part of the path
+    segments: list[str]
+    # `.pyi` from `*.pyi`, matched against file names
+    file_suffixes: list[str]
+
+
+class FolderEntry(NamedTuple):
+    name: str
+    path: str
+    is_dir: bool
+    is_symlink: bool
+
+
+class DiscoveredPackage(NamedTuple):
+    init_file: str
+    # Names of the files in the package folder
+    files: list[str]
+
+
+class DiscoveryResult(NamedTuple):
+    # Packages in the order a top-down walk visits them
+    packages: list[DiscoveredPackage]
+    # Entries that were not descended into or handed on: excluded entries, folders that
+    # are not packages and symbolic links to folders
+    skipped: int
+
+
+def compile_exclusions(exclusions: list[str]) -> ExclusionRules:
+    rules = ExclusionRules([], [], [])
+    for exclusion in exclusions or []:
+        exclusion = exclusion.strip()
+        if not exclusion:
+            continue
+        if exclusion.startswith("**/"):
+            exclusion = exclusion[3:]
+        exclusion = exclusion.replace("\\", "/").lower()
+        if exclusion.endswith("."):
+            exclusion = exclusion[:-1]
+
+        if exclusion.endswith("/") or "/" in exclusion:
+            if exclusion.startswith("./"):
+                exclusion = exclusion[2:]
+            rules.dir_prefixes.append(exclusion.rstrip("/") + "/")
+        elif exclusion.startswith("*."):
+            rules.file_suffixes.append(exclusion[1:])
+        else:
+            rules.segments.append(exclusion)
+    return rules
+
+
+def is_excluded(relative_path: str, rules: ExclusionRules) -> bool:
+    """:param relative_path: is relative to the project folder"""
+    path = relative_path.replace(os.sep, "/").lower()
+    path_with_slashes = f"/{path}/"
+    for dir_prefix in rules.dir_prefixes:
+        if (
+            path_with_slashes.startswith(f"/{dir_prefix}")
+            or f"/{dir_prefix}" in path_with_slashes
+        ):
+            return True
+
+    for part in path.split("/"):
+        for segment in rules.segments:
+            if _matches_suffix_pattern(part, segment):
+                return True
+
+    file_name = path.rsplit("/", 1)[-1]
+    return any(file_name.endswith(suffix) for suffix in rules.file_suffixes)
+
+
+def _matches_suffix_pattern(value: str, pattern: str) -> bool:
+    if "*" not in pattern:
+        return value == pattern
+    return value.endswith(pattern.lstrip("*"))
+
+
+def list_folder(folder: str) -> list[FolderEntry]:
+    """The entries of :param folder: on disk, read with a single `os.scandir`"""
+    with os.scandir(folder) as entries:
+        return [
+            FolderEntry(entry.name, entry.path, entry.is_dir(), entry.is_symlink())
+            for entry in entries
+        ]
+
+
+def discover_packages(
+    root: str, project_root: str, rules: ExclusionRules, tree: "SourceTree" = None
+) -> DiscoveryResult:
+    """
+    Finds the packages below :param root: in a single pass, reading every package folder once.
+    Excluded entries and folders without an `__init__.py` are pruned before they are read,
+    :param root: itself does not have to be a package. Folders are read from :param tree:,
+    the files on disk by default.
+    """
+    read_folder = tree.list_folder if tree else list_folder
+    is_file = tree.is_file if tree else os.path.isfile
+    has_rules = any(rules)
+    packages: list[DiscoveredPackage] = []
+    skipped = 0
+    pending = [root]
+    while pending:
+        folder = pending.pop()
+        files: list[str] = []
+        sub_folders: list[str] = []
+        try:
+            entries = sorted(read_folder(folder), key=lambda entry: entry.name)
+        except OSError as e:
+            print(e)
+            continue
+        for entry in entries:
+            if has_rules and is_excluded(
+                os.path.relpath(entry.path, project_root), rules
+            ):
+                skipped += 1
+            elif not entry.is_dir:
+                files.append(entry.name)
+            elif entry.is_symlink:
+                skipped += 1
+            else:
+                sub_folders.append(entry.path)
+
+        if INIT_FILE in files:
+            packages.append(DiscoveredPackage(os.path.join(folder, INIT_FILE), files))
+
+        # Pushed in reverse so the folders are visited in name order
+        for sub_folder in reversed(sub_folders):
+            if is_file(os.path.join(sub_folder, INIT_FILE)):
+                pending.append(sub_folder)
+            else:
+                skipped += 1
+    return DiscoveryResult(packages, skipped)
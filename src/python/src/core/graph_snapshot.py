@@ -0,0 +1,151 @@
+import glob
+import gzip
+import json
+import os
+from typing import TYPE_CHECKING, NamedTuple
+
+import astroid
+
+from src.core.parse_cache import _archlens_version
+
+if TYPE_CHECKING:
+    from src.core.bt_graph import BTGraph
+    from src.core.source_tree import SourceTree
+
+# Bump whenever the layout of a snapshot changes
+SNAPSHOT_FORMAT_VERSION = 1
+# Folder of the cache dir that keeps the snapshots
+SNAPSHOTS_FOLDER = "snapshots"
+# Snapshots kept in a folder, the oldest ones are removed when a new one is saved
+MAX_SNAPSHOTS = 10
+
+
+class GraphSnapshot(NamedTuple):
+    """
+    The packages, files and file dependencies of a BTGraph built from a commit, see
+    `BTGraph.load_snapshot`. Paths are relative to the root folder of the project and use
+    `/`, so a snapshot can be restored below any folder.
+    """
+
+    revision: str
+    # The config fields the graph depends on, see `snapshot_settings`
+    settings: dict
+    # Package folders, every package after its parent and after the packages before it in
+    # its parent. The root package is `""`.
+    modules: list[str]
+    # [index of the package, file name, git blob id of the content]
+    files: list[list]
+    # Per file, the indexes of the files it depends on
+    edges: list[list[int]]
+
+
+def snapshot_settings(config: dict) -> dict:
+    return {
+        "rootFolder": config.get("rootFolder"),
+        "exclusions": config.get("exclusions", []),
+        "importEngine": config.get("importEngine", "astroid"),
+    }
+
+
+def create_snapshot(
+    graph: "BTGraph", revision: str, config: dict, source_tree: "SourceTree" = None
+) -> GraphSnapshot:
+    """Snapshot of :param graph:, built from the files of :param revision:"""
+    source_tree = source_tree or graph.source_tree
+    modules = [graph.base_module, *graph.base_module.get_submodules_recursive()]
+    module_indexes = {module: index for index, module in enumerate(modules)}
+
+    files = []
+    file_indexes: dict[int, int] = {}
+    for module in modules:
+        for bt_file in module.file_list:
+            file_indexes[bt_file.id] = len(files)
+            files.append(
+                [
+                    module_indexes[module],
+                    bt_file.label,
+                    source_tree.content_id(bt_file.file),
+                ]
+            )
+
+    return GraphSnapshot(
+        revision=revision,
+        settings=snapshot_settings(config),
+        modules=[
+            _relative_folder(module.path, graph.root_module_location)
+            for module in modules
+        ],
+        files=files,
+        edges=[
+            [file_indexes[target] for target in bt_file.edge_ids]
+            for module in modules
+            for bt_file in module.file_list
+        ],
+    )
+
+
+def snapshot_file(folder: str, name: str, revision: str) -> str:
+    return os.path.join(folder, f"{name}-python-{revision}.json.gz")
+
+
+def save_snapshot(snapshot: GraphSnapshot, folder: str, name: str):
+    """Writes :param snapshot: to :param folder: and removes the oldest snapshots there"""
+    os.makedirs(folder, exist_ok=True)
+    path = snapshot_file(folder, name, snapshot.revision)
+    tmp_file = f"{path}.{os.getpid()}.tmp"
+    data = {"version": _snapshot_version(), **snapshot._asdict()}
+    with gzip.open(tmp_file, "wt", encoding="utf-8") as f:
+        json.dump(data, f, separators=(",", ":"))
+    os.replace(tmp_file, path)
+
+    snapshots = glob.glob(snapshot_file(glob.escape(folder), glob.escape(name), "*"))
+    snapshots.sort(key=os.path.getmtime)
+    for old_snapshot in snapshots[:-MAX_SNAPSHOTS]:
+        os.remove(old_snapshot)
+
+
+def load_snapshot(folder: str, name: str, revision: str, config: dict) -> GraphSnapshot:
+    """
+    The snapshot of :param revision: in :param folder:, None if there is none or it was
+    written by another version of ArchLens or with other settings.
+    """
+    path = snapshot_file(folder, name, revision)
+    if not os.path.exists(path):
+        return None
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError, EOFError):
+        return None
+    if data.pop("version", None) != _snapshot_version():
+        return None
+    snapshot = GraphSnapshot(**data)
+    if snapshot.revision != revision or snapshot.settings != snapshot_settings(config):
+        return None
+    return snapshot
+
+
+def matches_tree(snapshot: GraphSnapshot, source_tree: "SourceTree", root: str) -> bool:
+    """
+    Whether the files of :param snapshot:, restored below :param root:, have the content
+    they have in :param source_tree:
+    """
+    for module, name, content_id in snapshot.files:
+        path = os.path.join(restored_folder(root, snapshot.modules[module]), name)
+        if not source_tree.is_file(path) or source_tree.content_id(path) != content_id:
+            return False
+    return True
+
+
+def restored_folder(root: str, folder: str) -> str:
+    """The path of the package :param folder: of a snapshot restored below :param root:"""
+    return os.path.join(root, *folder.split("/")) if folder else root
+
+
+def _relative_folder(path: str, root: str) -> str:
+    relative_path = os.path.relpath(path, root)
+    return "" if relative_path == os.curdir else relative_path.replace(os.sep, "/")
+
+
+def _snapshot_version() -> str:
+    return f"{SNAPSHOT_FORMAT_VERSION}:{_archlens_version()}:{astroid.__version__}"
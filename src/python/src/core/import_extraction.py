@@ -0,0 +1,76 @@
+import ast
+from enum import Enum
+from typing import TYPE_CHECKING, NamedTuple
+
+if TYPE_CHECKING:
+    import astroid
+
+
+class ImportEngine(str, Enum):
+    # Full astroid trees, the tree of every project file is kept around
+    ASTROID = "astroid"
+    # Stdlib parser, only the import statements are kept
+    AST = "ast"
+
+
+class ImportRecord(NamedTuple):
+    name: str
+    level: int
+    lineno: int
+
+
+def extract_imports_from_astroid(module: "astroid.Module") -> list[ImportRecord]:
+    """
+    Imports of an astroid tree, in source order.
+    `from a import b` yields `a`, `import a.b` yields `a.b`.
+    Only statement bodies are searched, the `else`, `except` and `finally` blocks are not.
+    """
+    # Imported here so the command line can use ImportEngine without loading astroid
+    from astroid import nodes
+
+    return _extract_imports(
+        module,
+        import_from_type=nodes.ImportFrom,
+        import_type=nodes.Import,
+        get_modname=lambda node: node.modname,
+        get_names=lambda node: [name for name, _ in node.names],
+    )
+
+
+def extract_imports_from_source(source: bytes, path: str) -> list[ImportRecord]:
+    """
+    Same as :func:`extract_imports_from_astroid`, but parses :param source: with the
+    stdlib parser, which is a lot cheaper than building an inference capable tree
+    """
+    module = ast.parse(source, filename=path)
+    return _extract_imports(
+        module,
+        import_from_type=ast.ImportFrom,
+        import_type=ast.Import,
+        get_modname=lambda node: node.module or "",
+        get_names=lambda node: [alias.name for alias in node.names],
+    )
+
+
+def _extract_imports(
+    node, import_from_type, import_type, get_modname, get_names
+) -> list[ImportRecord]:
+    records = []
+    for sub_node in node.body:
+        if isinstance(sub_node, import_from_type):
+            records.append(
+                ImportRecord(
+                    get_modname(sub_node), sub_node.level or 0, sub_node.lineno
+                )
+            )
+        elif isinstance(sub_node, import_type):
+            records.extend(
+                ImportRecord(name, 0, sub_node.lineno) for name in get_names(sub_node)
+            )
+        elif isinstance(getattr(sub_node, "body", None), list):
+            records.extend(
+                _extract_imports(
+                    sub_node, import_from_type, import_type, get_modname, get_names
+                )
+            )
+    return records
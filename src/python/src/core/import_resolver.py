@@ -0,0 +1,93 @@
+import os
+
+from src.core.import_extraction import ImportRecord
+
+
+class ImportResolver:
+    """
+    Resolves imports against an index of the project's own modules.
+
+    The index is built from the files found while walking the project, so deciding that an
+    import is external (stdlib, site-packages, ...) never locates or parses the imported module.
+    Absolute imports are looked up relative to every search location, in the order Python
+    would (the first location wins). Relative imports are resolved from the importing package.
+    """
+
+    search_locations: list[str] = None
+
+    def __init__(self, search_locations: list[str], project_files: list[str]) -> None:
+        self.search_locations = [os.path.normpath(path) for path in search_locations]
+        # normalised path -> path as it is used by the graph
+        self._files: dict[str, str] = {}
+        # one index (dotted module name -> normalised path) per search location
+        self._modules_by_location: list[dict[str, str]] = [
+            {} for _ in self.search_locations
+        ]
+        self._memo: dict[tuple[str, int, str], str] = {}
+        for path in project_files:
+            self.add_file(path)
+
+    def add_file(self, path: str):
+        normalised_path = os.path.normpath(path)
+        self._files[normalised_path] = path
+        for location, modules in zip(self.search_locations, self._modules_by_location):
+            name = _module_name(normalised_path, location)
+            # A package wins over a module of the same name, like it does for Python
+            if name and not modules.get(name, "").endswith("__init__.py"):
+                modules[name] = normalised_path
+        self._memo.clear()
+
+    def remove_file(self, path: str):
+        normalised_path = os.path.normpath(path)
+        self._files.pop(normalised_path, None)
+        for location, modules in zip(self.search_locations, self._modules_by_location):
+            name = _module_name(normalised_path, location)
+            if name and modules.get(name) == normalised_path:
+                del modules[name]
+        self._memo.clear()
+
+    def project_file(self, path: str) -> str:
+        """The project file :param path: points to, None if it is not part of the project"""
+        return self._files.get(os.path.normpath(path))
+
+    def resolve_record(self, record: ImportRecord, importing_file: str) -> str:
+        return self.resolve(record.name, record.level, os.path.dirname(importing_file))
+
+    def resolve(self, name: str, level: int, package: str) -> str:
+        """
+        Project file imported by `name` (`from ..name import x` has level 2), None if the import does
+        not resolve to a file of the project. :param package: is the folder of the importing file.
+        """
+        key = (name, level, package if level else None)
+        if key not in self._memo:
+            self._memo[key] = self._resolve(name, level, package)
+        return self._memo[key]
+
+    def _resolve(self, name: str, level: int, package: str) -> str:
+        if level:
+            base = os.path.normpath(package)
+            for _ in range(level - 1):
+                base = os.path.dirname(base)
+            module_path = os.path.join(base, *name.split(".")) if name else base
+            for candidate in [
+                os.path.join(module_path, "__init__.py"),
+                f"{module_path}.py" if name else None,
+            ]:
+                if candidate in self._files:
+                    return self._files[candidate]
+            return None
+
+        for modules in self._modules_by_location:
+            if name in modules:
+                return self._files[modules[name]]
+        return None
+
+
+def _module_name(normalised_path: str, location: str) -> str:
+    relative_path = os.path.relpath(normalised_path, location)
+    if relative_path.startswith(os.pardir) or not relative_path.endswith(".py"):
+        return None
+    parts = relative_path[: -len(".py")].split(os.sep)
+    if parts[-1] == "__init__":
+        parts = parts[:-1]
+    return ".".join(parts)
@@ -0,0 +1,150 @@
+from src.core.bt_module import BTFile, BTModule
+from src.core.dependency_store import DependencyStore
+
+try:
+    import numpy
+    from scipy import sparse
+except ImportError:  # Optional, installed with the `sparse` extra
+    numpy = None
+    sparse = None
+
+
+class ModuleDependencyMatrix:
+    """
+    Number of file dependencies between every pair of modules, as a sparse module x module
+    matrix, together with the (from file, to file) pairs behind every entry.
+
+    Built in a single pass over the file edges of a dependency store. Rows and columns are
+    the positions of the modules in :param modules:, dependencies within a module and to
+    modules that are not in :param modules: are left out. With NumPy and SciPy installed the
+    counts are also kept as a CSR matrix and `roll_up` sums them with sparse matrix products.
+    """
+
+    modules: list[BTModule] = None
+
+    def __init__(self, modules: list[BTModule], store: DependencyStore) -> None:
+        self.modules = modules
+        self.positions: dict[BTModule, int] = {
+            module: position for position, module in enumerate(modules)
+        }
+        # row -> {column -> count}
+        self.rows: list[dict[int, int]] = [{} for _ in modules]
+        # (row, column) -> file pairs, in the order of the file edges
+        self.file_pairs: dict[tuple[int, int], list[tuple[BTFile, BTFile]]] = {}
+
+        positions_by_id = {
+            module.id: position for module, position in self.positions.items()
+        }
+        files = store.files
+        file_module = store.file_module
+        for row, module in enumerate(modules):
+            counts = self.rows[row]
+            for bt_file in module.file_list:
+                for target in bt_file.edge_ids:
+                    column = positions_by_id.get(file_module[target])
+                    if column is None or column == row:
+                        continue
+                    counts[column] = counts.get(column, 0) + 1
+                    self.file_pairs.setdefault((row, column), []).append(
+                        (bt_file, files[target])
+                    )
+
+        self.csr = self._to_csr() if sparse is not None else None
+
+    def count(self, from_module: BTModule, to_module: BTModule) -> int:
+        return self.rows[self.positions[from_module]].get(self.positions[to_module], 0)
+
+    def edge_files(
+        self, from_module: BTModule, to_module: BTModule
+    ) -> list[tuple[BTFile, BTFile]]:
+        key = (self.positions[from_module], self.positions[to_module])
+        return self.file_pairs.get(key, [])
+
+    def roll_up(
+        self, owner_groups: list[int], target_groups: list[list[int]], group_count: int
+    ) -> dict[tuple[int, int], int]:
+        """
+        Sums the counts per (from group, to group).
+
+        Row i is counted from group :param owner_groups:[i] (-1 leaves the row out) and
+        column j is counted to every group in :param target_groups:[j]. Counts from a group
+        to itself are left out.
+        """
+        if self.csr is not None:
+            return self._roll_up_sparse(owner_groups, target_groups, group_count)
+
+        counts: dict[tuple[int, int], int] = {}
+        for row, columns in enumerate(self.rows):
+            owner = owner_groups[row]
+            if owner < 0:
+                continue
+            for column, count in columns.items():
+                for target in target_groups[column]:
+                    if target != owner:
+                        key = (owner, target)
+                        counts[key] = counts.get(key, 0) + count
+        return counts
+
+    def group_cells(
+        self, owner_groups: list[int], target_groups: list[list[int]]
+    ) -> dict[tuple[int, int], list[tuple[int, int]]]:
+        """The (row, column) entries behind every entry of `roll_up`, grouped the same way"""
+        grouped: dict[tuple[int, int], list[tuple[int, int]]] = {}
+        for row, column in self.file_pairs:
+            owner = owner_groups[row]
+            if owner < 0:
+                continue
+            for target in target_groups[column]:
+                if target != owner:
+                    grouped.setdefault((owner, target), []).append((row, column))
+        return grouped
+
+    def cells_file_pairs(
+        self, cells: list[tuple[int, int]]
+    ) -> list[tuple[BTFile, BTFile]]:
+        return [pair for cell in cells for pair in self.file_pairs[cell]]
+
+    def _to_csr(self):
+        rows = [row for row, columns in enumerate(self.rows) for _ in columns]
+        columns = [column for row_columns in self.rows for column in row_columns]
+        counts = [count for row_columns in self.rows for count in row_columns.values()]
+        size = len(self.modules)
+        return sparse.csr_matrix(
+            (numpy.array(counts, dtype=numpy.int64), (rows, columns)),
+            shape=(size, size),
+        )
+
+    def _roll_up_sparse(
+        self, owner_groups: list[int], target_groups: list[list[int]], group_count: int
+    ) -> dict[tuple[int, int], int]:
+        size = len(self.modules)
+        owned_rows = [row for row, owner in enumerate(owner_groups) if owner >= 0]
+        owners = sparse.csr_matrix(
+            (
+                numpy.ones(len(owned_rows), dtype=numpy.int64),
+                (owned_rows, [owner_groups[row] for row in owned_rows]),
+            ),
+            shape=(size, group_count),
+        )
+        target_columns = [
+            column for column, groups in enumerate(target_groups) for _ in groups
+        ]
+        targets = sparse.csr_matrix(
+            (
+                numpy.ones(len(target_columns), dtype=numpy.int64),
+                (
+                    target_columns,
+                    [group for groups in target_groups for group in groups],
+                ),
+            ),
+            shape=(size, group_count),
+        )
+
+        rolled_up = (owners.T @ self.csr @ targets).tocoo()
+        return {
+            (int(owner), int(target)): int(count)
+            for owner, target, count in zip(
+                rolled_up.row, rolled_up.col, rolled_up.data
+            )
+            if owner != target and count
+        }
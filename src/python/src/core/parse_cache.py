@@ -0,0 +1,93 @@
+import hashlib
+import json
+import os
+from importlib import metadata
+
+import astroid
+
+# Bump whenever the layout of a cache entry or the way imports are resolved changes
+CACHE_FORMAT_VERSION = 2
+CACHE_FILE_NAME = "parse-cache.json"
+
+
+def _archlens_version() -> str:
+    try:
+        return metadata.version("ArchLens")
+    except metadata.PackageNotFoundError:
+        return "dev"
+
+
+class ParseCache:
+    """
+    On-disk cache of the project files each source file depends on.
+
+    Entries are keyed by the file's path relative to the project and the hash of its
+    content, and store the resolved targets relative to the project as well, so the
+    cache directory can be moved between checkouts (e.g. restored as a CI artifact).
+    Only the entries used during a run are written back, which keeps the file from
+    growing forever.
+    """
+
+    cache_dir: str = None
+    version: str = None
+
+    def __init__(self, cache_dir: str) -> None:
+        self.cache_dir = cache_dir
+        self.version = (
+            f"{CACHE_FORMAT_VERSION}:{_archlens_version()}:{astroid.__version__}"
+        )
+        self.hits = 0
+        self.misses = 0
+        self._entries: dict[str, dict] = {}
+        self._used_entries: dict[str, dict] = {}
+        self._load()
+
+    @property
+    def cache_file(self) -> str:
+        return os.path.join(self.cache_dir, CACHE_FILE_NAME)
+
+    @staticmethod
+    def key(relative_path: str, content: bytes) -> str:
+        digest = hashlib.sha256(relative_path.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(content)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> dict:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._used_entries[key] = entry
+        return entry
+
+    def put(self, key: str, targets: list[str], unresolved: list[tuple[str, int]]):
+        entry = {"targets": targets, "unresolved": unresolved}
+        self._entries[key] = entry
+        self._used_entries[key] = entry
+
+    def invalidate(self, key: str):
+        """Forget an entry that turned out to be stale, and count it as a miss"""
+        self._entries.pop(key, None)
+        self._used_entries.pop(key, None)
+        self.hits -= 1
+        self.misses += 1
+
+    def save(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_file = f"{self.cache_file}.{os.getpid()}.tmp"
+        with open(tmp_file, "w") as f:
+            json.dump({"version": self.version, "entries": self._used_entries}, f)
+        os.replace(tmp_file, self.cache_file)
+
+    def _load(self):
+        if not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == self.version:
+            self._entries = data.get("entries", {})
@@ -0,0 +1,32 @@
+import hashlib
+import os
+
+from src.core.file_discovery import FolderEntry, list_folder
+
+
+class SourceTree:
+    """
+    Where BTGraph reads the folders and files of a project from: the files on disk.
+    See `git_integration/git_tree.py` for a tree read from the objects of a git repository.
+    """
+
+    # Whether the paths of the tree are files on disk, that astroid and parse workers can
+    # read themselves. Otherwise every source is read from the tree and handed to them.
+    on_disk: bool = True
+
+    def list_folder(self, folder: str) -> list[FolderEntry]:
+        return list_folder(folder)
+
+    def is_file(self, path: str) -> bool:
+        return os.path.isfile(path)
+
+    def read(self, path: str) -> bytes:
+        with open(path, "rb") as f:
+            return f.read()
+
+    def content_id(self, path: str) -> str:
+        """The git blob id of the content of :param path:"""
+        content = self.read(path)
+        digest = hashlib.sha1(b"blob %d\0" % len(content))
+        digest.update(content)
+        return digest.hexdigest()
@@ -0,0 +1,110 @@
+"""
+Compares the astroid and the stdlib ast import engines on a synthetic project.
+
+    python src/devScripts/benchmark_import_engines.py --packages 40 --files 25
+
+Both engines must produce the same file level edges, the script exits with an
+error if they do not.
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from astroid.manager import AstroidManager  # noqa: E402
+
+from src.core.bt_graph import BTGraph  # noqa: E402
+
+STDLIB_MODULES = ["os", "sys", "json", "typing", "collections", "dataclasses"]
+
+
+def create_project(base_dir: str, package_count: int, file_count: int, seed: int):
+    rng = random.Random(seed)
+    root = os.path.join(base_dir, "synthetic")
+    packages = ["synthetic"]
+    for i in range(package_count):
+        parent = rng.choice(packages)
+        packages.append(f"{parent}.pkg{i}")
+
+    modules = []
+    for package in packages:
+        os.makedirs(os.path.join(base_dir, *package.split(".")), exist_ok=True)
+        modules.append(package)
+        modules.extend(f"{package}.mod{j}" for j in range(file_count))
+
+    for module in modules:
+        is_package = module in packages
+        parts = module.split(".")
+        path = os.path.join(base_dir, *parts)
+        path = os.path.join(path, "__init__.py") if is_package else f"{path}.py"
+
+        lines = []
+        for target in rng.sample(modules, min(len(modules), 6)):
+            lines.append(rng.choice([f"import {target}", f"from {target} import x"]))
+        lines.append(f"import {rng.choice(STDLIB_MODULES)}")
+        lines.append("try:")
+        lines.append(f"    from {rng.choice(modules)} import y")
+        lines.append("except ImportError:")
+        lines.append("    pass")
+        lines.append("def function():")
+        lines.append(f"    import {rng.choice(modules)}")
+        lines.append("    return 1")
+        lines.append("x = y = 1")
+        with open(path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+    return root, len(modules)
+
+
+def build(base_dir: str, engine: str):
+    am = AstroidManager()
+    am.brain["astroid_cache"] = {}
+    graph = BTGraph(am)
+    config = {
+        "_config_path": base_dir,
+        "rootFolder": "synthetic",
+        "importEngine": engine,
+    }
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        graph.build_graph(config)
+    duration = time.perf_counter() - start
+    edges = {
+        bt_file.file: sorted(edge.file for edge in bt_file.edge_to)
+        for bt_file in graph.get_all_bt_files_map().values()
+    }
+    return duration, edges
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--packages", type=int, default=40)
+    parser.add_argument("--files", type=int, default=25)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as base_dir:
+        _, file_count = create_project(base_dir, args.packages, args.files, args.seed)
+        print(f"Synthetic project: {args.packages + 1} packages, {file_count} files")
+
+        results = {}
+        for engine in ["astroid", "ast"]:
+            duration, edges = build(base_dir, engine)
+            results[engine] = edges
+            edge_count = sum(len(targets) for targets in edges.values())
+            print(f"{engine:>8}: {duration:7.2f}s  ({edge_count} edges)")
+
+        if results["astroid"] != results["ast"]:
+            sys.exit("The engines produced different edges")
+        print("Both engines produced the same edges")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Compares the size, time and peak memory of the standard and the compact JSON output.
+
+    python src/devScripts/benchmark_json_output.py --packages 80 --files 40
+
+The complete view of a synthetic project (see benchmark_import_engines.py) is saved in
+every format: standard, compact with the standard library encoder and, when orjson is
+installed, compact with orjson. Peak memory is the peak of the Python heap while the
+view is saved, measured with tracemalloc. The script fails when a compact document does
+not hold the same packages, edges and file relations as the standard one.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+DEV_SCRIPTS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(os.path.dirname(DEV_SCRIPTS)))
+sys.path.insert(0, DEV_SCRIPTS)
+
+from astroid.manager import AstroidManager  # noqa: E402
+
+from benchmark_import_engines import create_project  # noqa: E402
+from src.core.bt_graph import BTGraph  # noqa: E402
+from src.providers.json import json_render  # noqa: E402
+from src.utils.run_context import RunContext  # noqa: E402
+from src.views.view_manager import render_views  # noqa: E402
+
+VIEW_NAME = "completeView"
+
+
+def build(base_dir: str) -> tuple[BTGraph, dict]:
+    config = {
+        "name": "synthetic",
+        "_config_path": base_dir,
+        "rootFolder": "synthetic",
+        "importEngine": "ast",
+        "views": {VIEW_NAME: {"packages": [], "ignorePackages": []}},
+    }
+    graph = BTGraph(AstroidManager())
+    with contextlib.redirect_stdout(io.StringIO()):
+        graph.build_graph(config)
+    return graph, config
+
+
+def save(
+    graph: BTGraph, config: dict, save_location: str, json_format: str, use_orjson: bool
+):
+    config = {**config, "saveLocation": save_location, "jsonFormat": json_format}
+    orjson = json_render.orjson
+    json_render.orjson = orjson if use_orjson else None
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        render_views(
+            graph, config, json_render.save_json, RunContext.from_config(config)
+        )
+        duration = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        json_render.orjson = orjson
+    return os.path.join(save_location, f"synthetic-{VIEW_NAME}.json"), duration, peak
+
+
+def expand_compact(document: dict) -> dict:
+    """The standard document a compact document stands for"""
+    packages = document["packages"]
+    files = [{"name": name, "path": path} for name, path in document["files"]]
+    return {
+        "title": document["title"],
+        "packages": packages,
+        "edges": [
+            {
+                "state": edge["state"],
+                "fromPackage": packages[edge["fromPackage"]]["name"],
+                "toPackage": packages[edge["toPackage"]]["name"],
+                "label": edge["label"],
+                "relations": [
+                    {"from_file": files[from_file], "to_file": files[to_file]}
+                    for from_file, to_file in edge["relations"]
+                ],
+            }
+            for edge in document["edges"]
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--packages", type=int, default=80)
+    parser.add_argument("--files", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    runs = [("standard", "standard", False), ("compact", "compact", False)]
+    if json_render.orjson is not None:
+        runs.append(("compact+orjson", "compact", True))
+    else:
+        print("orjson is not installed, the compact format is only measured with json")
+
+    with tempfile.TemporaryDirectory() as base_dir:
+        _, file_count = create_project(base_dir, args.packages, args.files, args.seed)
+        print(f"Synthetic project: {args.packages + 1} packages, {file_count} files")
+        graph, config = build(base_dir)
+
+        documents = {}
+        for label, json_format, use_orjson in runs:
+            save_location = os.path.join(base_dir, "out", label)
+            path, duration, peak = save(
+                graph, config, save_location, json_format, use_orjson
+            )
+            size = os.path.getsize(path)
+            print(
+                f"{label:>15}: {size / 1e6:8.2f} MB  {duration:6.2f}s  "
+                f"peak {peak / 1e6:8.2f} MB"
+            )
+            with open(path, "rb") as f:
+                document = json.load(f)
+            documents[label] = (
+                document if json_format == "standard" else expand_compact(document)
+            )
+
+    for label, document in documents.items():
+        if document != documents["standard"]:
+            sys.exit(f"The {label} document differs from the standard document")
+    print("Every format holds the same view")
+
+
+if __name__ == "__main__":
+    main()
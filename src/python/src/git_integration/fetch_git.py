@@ -1,11 +1,119 @@
+import hashlib
+import os
+
 import git
 
+# Folder of the cache dir that keeps the base branches between runs
+MIRRORS_FOLDER = "git-mirrors"
+
+
+def fetch_base_revision(
+    config: dict, tmp_dir: str, cache_dir: str = None
+) -> tuple[git.Repo, str, str]:
+    """
+    The repository holding the `github.branch` of the config, the commit the branch points
+    to and the folder of the config in the repository (`""` at its root).
+
+    With a :param cache_dir: the branch is kept in a bare mirror there, see `update_mirror`.
+    Otherwise it is fetched into the repository the config is in: only the objects it misses
+    are downloaded and nothing is checked out. If the fetch fails, the branch of the
+    repository itself is used. Outside of a repository the tip of the branch is cloned bare
+    into :param tmp_dir:, with the config at the root of the repository.
+    """
+    url = config["github"]["url"]
+    branch = config["github"]["branch"]
+    try:
+        repo = git.Repo(config["_config_path"], search_parent_directories=True)
+    except (git.InvalidGitRepositoryError, git.NoSuchPathError):
+        repo = None
+
+    config_folder = ""
+    if repo is not None:
+        config_folder = os.path.relpath(config["_config_path"], repo.working_tree_dir)
+        config_folder = (
+            "" if config_folder == os.curdir else config_folder.replace(os.sep, "/")
+        )
+
+    if cache_dir:
+        mirror = update_mirror(cache_dir, url, branch)
+        return (
+            mirror,
+            mirror.git.rev_parse(f"refs/heads/{branch}^{{commit}}"),
+            config_folder,
+        )
+
+    if repo is None:
+        repo = git.Repo.clone_from(
+            url, tmp_dir, bare=True, branch=branch, single_branch=True, depth=1
+        )
+        return repo, repo.git.rev_parse("HEAD^{commit}"), ""
+
+    try:
+        # Fetching the whole history of the branch into a shallow clone (as CI checkouts
+        # usually are) would download far more than the tip
+        depth = ["--depth", "1"] if _is_shallow(repo) else []
+        repo.git.fetch("--no-tags", *depth, url, branch)
+        return repo, repo.git.rev_parse("FETCH_HEAD^{commit}"), config_folder
+    except git.GitCommandError as e:
+        print(f"Could not fetch {branch} from {url}, using the local branch: {e}")
+
+    for ref in [f"refs/remotes/origin/{branch}", f"refs/heads/{branch}", branch]:
+        try:
+            return (
+                repo,
+                repo.git.rev_parse("--verify", f"{ref}^{{commit}}"),
+                config_folder,
+            )
+        except git.GitCommandError:
+            continue
+    raise Exception(f"{branch} branch does not exist in {repo.working_tree_dir}")
+
+
+def clean_head_revision(config: dict) -> str:
+    """
+    The commit checked out in the repository the config is in, None outside of a repository
+    or when the root folder of the config has changes that are not committed.
+    """
+    try:
+        repo = git.Repo(config["_config_path"], search_parent_directories=True)
+    except (git.InvalidGitRepositoryError, git.NoSuchPathError):
+        return None
+    root_folder = os.path.join(config["_config_path"], config["rootFolder"])
+    if repo.git.status("--porcelain", "--", root_folder):
+        return None
+    return repo.head.commit.hexsha
+
+
+def update_mirror(cache_dir: str, url: str, branch: str) -> git.Repo:
+    """
+    Bare repository in :param cache_dir: that keeps the tip of :param branch: of :param url:
+    between runs.
+
+    The mirror is shallow: the first run downloads the files of the tip only, later runs
+    only download the objects that changed since. If the fetch fails, the tip of the
+    previous run is used.
+    """
+    name = hashlib.sha256(url.encode("utf-8")).hexdigest()[:16]
+    path = os.path.join(cache_dir, MIRRORS_FOLDER, f"{name}.git")
+    if os.path.isdir(path):
+        mirror = git.Repo(path)
+    else:
+        mirror = git.Repo.init(path, mkdir=True, bare=True)
 
-def fetch_git_repo(tmp_dir, github_url, branch):
-    repo_path = github_url
-    repo = git.Repo.clone_from(repo_path, tmp_dir)
+    try:
+        mirror.git.fetch(
+            "--no-tags",
+            "--depth",
+            "1",
+            url,
+            f"+refs/heads/{branch}:refs/heads/{branch}",
+        )
+    except git.GitCommandError as e:
+        if f"refs/heads/{branch}" not in [ref.path for ref in mirror.references]:
+            raise
+        print(f"Could not fetch {branch} from {url}, using the mirrored branch: {e}")
+    return mirror
 
-    repo.git.checkout(branch)
-    repo.remotes.origin.pull()
 
-    # repo.git.checkout(original_branch)
+def _is_shallow(repo: git.Repo) -> bool:
+    return repo.git.rev_parse("--is-shallow-repository") == "true"
@@ -0,0 +1,76 @@
+import os
+
+import git
+
+from src.core.file_discovery import FolderEntry
+from src.core.source_tree import SourceTree
+
+SYMLINK_MODE = "120000"
+
+
+class GitTree(SourceTree):
+    """
+    The files of a commit, read straight from the object database of a repository (bare or
+    not) as if the commit was checked out at :param root:. Nothing is written to disk.
+
+    The tree is listed once with `git ls-tree`, file contents are read on demand through
+    the `git cat-file --batch` process GitPython keeps open for the repository. Only the
+    files below :param prefix: (a folder of the repository, e.g. `src/app`) are listed.
+    """
+
+    on_disk = False
+
+    def __init__(
+        self, repo: git.Repo, revision: str, root: str, prefix: str = ""
+    ) -> None:
+        self.repo = repo
+        self.revision = revision
+        self.root = root
+        # normalised path -> blob id
+        self._blobs: dict[str, str] = {}
+        # normalised folder -> {entry name -> is a folder}
+        self._folders: dict[str, dict[str, bool]] = {}
+
+        pathspec = [prefix] if prefix not in ("", ".") else []
+        listing = repo.git.ls_tree("-r", "-z", "--full-tree", revision, "--", *pathspec)
+        for entry in listing.split("\0"):
+            if not entry:
+                continue
+            meta, path = entry.split("\t", 1)
+            mode, object_type, object_id = meta.split(" ")
+            # Symbolic links and submodules have no content to parse
+            if object_type != "blob" or mode == SYMLINK_MODE:
+                continue
+
+            folder = os.path.normpath(root)
+            *folder_names, file_name = path.split("/")
+            for folder_name in folder_names:
+                self._folders.setdefault(folder, {})[folder_name] = True
+                folder = os.path.join(folder, folder_name)
+            self._folders.setdefault(folder, {})[file_name] = False
+            self._blobs[os.path.join(folder, file_name)] = object_id
+
+    def list_folder(self, folder: str) -> list[FolderEntry]:
+        entries = self._folders.get(os.path.normpath(folder))
+        if entries is None:
+            raise FileNotFoundError(f"{folder} is not a folder of {self.revision}")
+        return [
+            FolderEntry(name, os.path.join(folder, name), is_dir, False)
+            for name, is_dir in entries.items()
+        ]
+
+    def is_file(self, path: str) -> bool:
+        return os.path.normpath(path) in self._blobs
+
+    def read(self, path: str) -> bytes:
+        object_id = self._blobs.get(os.path.normpath(path))
+        if object_id is None:
+            raise FileNotFoundError(f"{path} is not a file of {self.revision}")
+        _, _, _, data = self.repo.git.get_object_data(object_id)
+        return data
+
+    def content_id(self, path: str) -> str:
+        object_id = self._blobs.get(os.path.normpath(path))
+        if object_id is None:
+            raise FileNotFoundError(f"{path} is not a file of {self.revision}")
+        return object_id
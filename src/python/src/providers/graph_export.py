@@ -0,0 +1,214 @@
+import os
+import sqlite3
+from array import array
+from typing import NamedTuple
+
+from src.core.bt_graph import BTGraph
+from src.core.module_dependency_matrix import ModuleDependencyMatrix
+
+try:
+    import numpy
+except ImportError:  # Optional, installed with the `sparse` extra
+    numpy = None
+
+# Bump whenever the tables or columns of an export change
+EXPORT_FORMAT_VERSION = 1
+SQLITE_EXTENSIONS = (".sqlite", ".sqlite3", ".db")
+NPZ_EXTENSION = ".npz"
+
+
+class GraphTables(NamedTuple):
+    """
+    The package and file graph of a BTGraph as columns. Modules and files are numbered from
+    0 (modules parents first, files in the order of their modules) and every column holds
+    one value per module, file or edge. Paths are relative to the project folder.
+    """
+
+    module_path: list[str]
+    # -1 for the root package
+    module_parent: array
+    module_depth: array
+    file_module: array
+    file_path: list[str]
+    file_edge_from: array
+    file_edge_to: array
+    # Number of file dependencies from a package to another, without the sub packages
+    module_edge_from: array
+    module_edge_to: array
+    module_edge_count: array
+
+
+def graph_tables(graph: BTGraph) -> GraphTables:
+    modules = [graph.base_module, *graph.base_module.get_submodules_recursive()]
+    module_ids = {module.id: index for index, module in enumerate(modules)}
+    files = [bt_file for module in modules for bt_file in module.file_list]
+    file_ids = {bt_file.id: index for index, bt_file in enumerate(files)}
+
+    tables = GraphTables(
+        module_path=[_relative_path(graph, module.path) for module in modules],
+        module_parent=array(
+            "i",
+            [
+                -1
+                if module is graph.base_module
+                else module_ids[module.parent_module.id]
+                for module in modules
+            ],
+        ),
+        module_depth=array("i", [module.depth for module in modules]),
+        file_module=array("i", [module_ids[bt_file.module.id] for bt_file in files]),
+        file_path=[_relative_path(graph, bt_file.file) for bt_file in files],
+        file_edge_from=array("i"),
+        file_edge_to=array("i"),
+        module_edge_from=array("i"),
+        module_edge_to=array("i"),
+        module_edge_count=array("i"),
+    )
+    for index, bt_file in enumerate(files):
+        for target in bt_file.edge_ids:
+            tables.file_edge_from.append(index)
+            tables.file_edge_to.append(file_ids[target])
+
+    matrix = ModuleDependencyMatrix(modules, graph.dependencies)
+    for row, columns in enumerate(matrix.rows):
+        for column, count in columns.items():
+            tables.module_edge_from.append(row)
+            tables.module_edge_to.append(column)
+            tables.module_edge_count.append(count)
+    return tables
+
+
+def _relative_path(graph: BTGraph, path: str) -> str:
+    relative_path = os.path.relpath(path, graph.target_project_base_location)
+    return relative_path.replace(os.sep, "/")
+
+
+def check_export_path(path: str) -> str:
+    """The extension of :param path:, raises when the graph cannot be exported to it"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in (*SQLITE_EXTENSIONS, NPZ_EXTENSION):
+        raise Exception(
+            f"Cannot export the graph to {path}, use a .sqlite, .sqlite3, .db or .npz file"
+        )
+    if extension == NPZ_EXTENSION and numpy is None:
+        raise Exception(
+            "Exporting the graph to .npz needs NumPy, install it with the `sparse` extra"
+        )
+    return extension
+
+
+def export_graph(graph: BTGraph, path: str):
+    """
+    Writes the graph to :param path:, a SQLite database (`.sqlite`, `.sqlite3`, `.db`) or
+    NumPy arrays (`.npz`), see `export_sqlite` and `export_npz`
+    """
+    extension = check_export_path(path)
+    tables = graph_tables(graph)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_file = f"{path}.{os.getpid()}.tmp{extension}"
+    try:
+        if extension == NPZ_EXTENSION:
+            export_npz(tables, tmp_file)
+        else:
+            export_sqlite(tables, tmp_file)
+    except BaseException:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+    os.replace(tmp_file, path)
+
+
+def export_sqlite(tables: GraphTables, path: str):
+    """
+    One table per kind of node and edge, with the module and file numbers as ids:
+    `modules(id, path, name, parent, depth)`, `files(id, module, name, path)`,
+    `file_edges(from_file, to_file)` and `module_edges(from_module, to_module, count)`.
+    Edges are indexed on both ends. `metadata` holds the format version.
+    """
+    connection = sqlite3.connect(path)
+    try:
+        with connection:
+            connection.executescript(
+                """
+                CREATE TABLE metadata (key TEXT PRIMARY KEY, value TEXT);
+                CREATE TABLE modules (
+                    id INTEGER PRIMARY KEY, path TEXT, name TEXT, parent INTEGER, depth INTEGER
+                );
+                CREATE TABLE files (id INTEGER PRIMARY KEY, module INTEGER, name TEXT, path TEXT);
+                CREATE TABLE file_edges (from_file INTEGER, to_file INTEGER);
+                CREATE TABLE module_edges (from_module INTEGER, to_module INTEGER, count INTEGER);
+                """
+            )
+            connection.execute(
+                "INSERT INTO metadata VALUES ('version', ?)",
+                (str(EXPORT_FORMAT_VERSION),),
+            )
+            connection.executemany(
+                "INSERT INTO modules VALUES (?, ?, ?, ?, ?)",
+                (
+                    (
+                        index,
+                        path,
+                        path.rsplit("/", 1)[-1],
+                        None if parent < 0 else parent,
+                        depth,
+                    )
+                    for index, (path, parent, depth) in enumerate(
+                        zip(
+                            tables.module_path,
+                            tables.module_parent,
+                            tables.module_depth,
+                        )
+                    )
+                ),
+            )
+            connection.executemany(
+                "INSERT INTO files VALUES (?, ?, ?, ?)",
+                (
+                    (index, module, path.rsplit("/", 1)[-1], path)
+                    for index, (module, path) in enumerate(
+                        zip(tables.file_module, tables.file_path)
+                    )
+                ),
+            )
+            connection.executemany(
+                "INSERT INTO file_edges VALUES (?, ?)",
+                zip(tables.file_edge_from, tables.file_edge_to),
+            )
+            connection.executemany(
+                "INSERT INTO module_edges VALUES (?, ?, ?)",
+                zip(
+                    tables.module_edge_from,
+                    tables.module_edge_to,
+                    tables.module_edge_count,
+                ),
+            )
+            connection.executescript(
+                """
+                CREATE INDEX modules_parent ON modules (parent);
+                CREATE INDEX files_module ON files (module);
+                CREATE INDEX file_edges_from ON file_edges (from_file);
+                CREATE INDEX file_edges_to ON file_edges (to_file);
+                CREATE INDEX module_edges_from ON module_edges (from_module);
+                CREATE INDEX module_edges_to ON module_edges (to_module);
+                """
+            )
+    finally:
+        connection.close()
+
+
+def export_npz(tables: GraphTables, path: str):
+    """
+    One uncompressed array per column of :param tables:, named like the column, plus
+    `version`. Numbers are int32, paths are unicode arrays.
+    """
+    if numpy is None:
+        raise Exception(
+            "Exporting the graph to .npz needs NumPy, install it with the `sparse` extra"
+        )
+    arrays = {
+        name: numpy.array(column, dtype=str if name.endswith("path") else numpy.int32)
+        for name, column in tables._asdict().items()
+    }
+    with open(path, "wb") as f:
+        numpy.savez(f, version=numpy.int32(EXPORT_FORMAT_VERSION), **arrays)
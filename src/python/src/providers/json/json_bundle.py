@@ -0,0 +1,119 @@
+import os
+import threading
+from typing import Callable
+
+from src.providers.json.json_render import json_encoder, stream_json_file
+from src.providers.output_manifest import OutputManifest
+from src.views.view_entities import ViewPackage
+
+# Bump whenever the layout of the bundle changes
+BUNDLE_FORMAT_VERSION = 1
+
+
+class JsonBundle:
+    """
+    Every view of a run in one JSON document, saved to :param save_location:.
+
+    Views are collected with `add_view` while they are saved (possibly on several threads)
+    and `save` writes them at once. Files, packages and file relations are stored once in
+    tables shared by all views:
+
+    - `files`: `[name, path]` of every file in a relation
+    - `packages`: `{"path", "name"}` of every package drawn in a view
+    - `relations`: `[from file, to file]` of every file dependency behind an edge
+    - `views`: per view, its `packages` as `[package, state]` and its `edges`, with
+      `fromPackage`/`toPackage` indexes into `packages` and `relations` indexes into
+      `relations`
+    """
+
+    def __init__(self, save_location: str, title: str) -> None:
+        self.save_location = save_location
+        self.title = title
+        self._files: dict[tuple[str, str], int] = {}
+        self._packages: dict[tuple[str, str], int] = {}
+        self._relations: dict[tuple[int, int], int] = {}
+        self._views: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def add_view(self, view_graph: list[ViewPackage], view_name: str, config: dict):
+        """Adds a view, the signature of the other savers of `render_views`"""
+        with self._lock:
+            package_indexes = {
+                package.name: self._index(self._packages, (package.path, package.name))
+                for package in view_graph
+            }
+            edges = []
+            for package in view_graph:
+                for dependency in package.view_dependency_list:
+                    edge = dependency.render_json_edge()
+                    edge["fromPackage"] = package_indexes[edge["fromPackage"]]
+                    edge["toPackage"] = package_indexes[edge["toPackage"]]
+                    edge["relations"] = [
+                        self._index(
+                            self._relations,
+                            (
+                                self._index(
+                                    self._files, (from_file.label, from_file.file)
+                                ),
+                                self._index(self._files, (to_file.label, to_file.file)),
+                            ),
+                        )
+                        for from_file, to_file in dependency.edge_files
+                    ]
+                    edges.append(edge)
+
+            self._views[view_name] = {
+                "packages": [
+                    [package_indexes[package.name], package.state.name]
+                    for package in view_graph
+                ],
+                "edges": edges,
+            }
+
+    def save(self, view_names: list[str], manifest: OutputManifest = None):
+        """Writes the views of :param view_names: that were added, in that order"""
+        views = [view_name for view_name in view_names if view_name in self._views]
+        if not views:
+            return
+        stream_json_file(
+            self.save_location,
+            lambda write: self._write(write, views),
+            os.path.basename(self.save_location),
+            manifest,
+        )
+
+    def _write(self, write: Callable[[bytes], None], views: list[str]):
+        encode = json_encoder()
+        write(b'{"version":%d,"title":' % BUNDLE_FORMAT_VERSION)
+        write(encode(self.title))
+        write(b',"files":')
+        write(encode([list(file) for file in self._files]))
+        write(b',"packages":')
+        write(encode([{"path": path, "name": name} for path, name in self._packages]))
+        write(b',"relations":')
+        write(encode([list(relation) for relation in self._relations]))
+        write(b',"views":{')
+        for index, view_name in enumerate(views):
+            if index:
+                write(b",")
+            write(encode(view_name))
+            write(b":")
+            write(encode(self._views[view_name]))
+        write(b"}}")
+
+    @staticmethod
+    def _index(table: dict, key) -> int:
+        index = table.get(key)
+        if index is None:
+            index = table[key] = len(table)
+        return index
+
+
+def create_json_bundle(config: dict, diff: bool = False) -> JsonBundle:
+    """The bundle of the views of a run, `<name>.bundle.json` or `<name>-diff.bundle.json`"""
+    project_name = config["name"]
+    file_name = (
+        f"{project_name}-diff.bundle.json" if diff else f"{project_name}.bundle.json"
+    )
+    title = f"{project_name}-diff" if diff else project_name
+    return JsonBundle(os.path.join(config["saveLocation"], file_name), title)
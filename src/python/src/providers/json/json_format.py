@@ -0,0 +1,11 @@
+from enum import Enum
+
+
+class JsonFormat(str, Enum):
+    # One indented document per view, every file relation holds the name and path of its files
+    STANDARD = "standard"
+    # Streamed without indentation, file relations are indexes into a file table
+    COMPACT = "compact"
+    # Every view of a run in one compact document, sharing one table of files, packages and
+    # file relations
+    BUNDLE = "bundle"
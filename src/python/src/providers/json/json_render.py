@@ -1,23 +1,48 @@
+import hashlib
 import os
+import threading
+from typing import Callable
 
+from src.providers.json.json_format import JsonFormat
+from src.providers.output_manifest import OutputManifest
 from src.views.view_entities import ViewPackage
 import json
 
+try:
+    import orjson
+except ImportError:  # Optional, installed with the `fastjson` extra
+    orjson = None
 
-def save_json(view_graph, view_name, config):
-    json = _render_json_graph(view_graph, view_name, config)
+# Bump whenever the layout of the compact format changes
+COMPACT_FORMAT_VERSION = 1
+
+
+def save_json(view_graph, view_name, config, manifest: OutputManifest = None):
     project_name = config["name"]
     save_location = os.path.join(config["saveLocation"], f"{project_name}-{view_name}")
-    _save_json_file(save_location + ".json", json)
+    _save_view(view_graph, view_name, config, save_location + ".json", manifest)
 
 
-def save_json_diff(view_graph, view_name, config):
-    json = _render_json_graph(view_graph, view_name, config)
+def save_json_diff(view_graph, view_name, config, manifest: OutputManifest = None):
     project_name = config["name"]
     save_location = os.path.join(
         config["saveLocation"], f"{project_name}-diff-{view_name}"
     )
-    _save_json_file(save_location + ".json", json)
+    _save_view(view_graph, view_name, config, save_location + ".json", manifest)
+
+
+def _save_view(
+    view_graph: list[ViewPackage],
+    view_name,
+    config,
+    save_location: str,
+    manifest: OutputManifest = None,
+):
+    if JsonFormat(config.get("jsonFormat", "standard")) == JsonFormat.COMPACT:
+        _save_compact_json_file(save_location, view_graph, view_name, config, manifest)
+        return
+    json = _render_json_graph(view_graph, view_name, config)
+    _save_json_file(save_location, json, view_name, manifest)
 
 
 def _render_json_graph(view_graph: list[ViewPackage], view_name, config):
@@ -40,7 +65,118 @@ def _render_json_graph(view_graph: list[ViewPackage], view_name, config):
     return json_dict
 
 
-def _save_json_file(save_location, json_dict):
+def _save_json_file(
+    save_location, json_dict, view_name=None, manifest: OutputManifest = None
+):
+    """With a :param manifest: the file is only written when its content changed"""
+    encoder = json.JSONEncoder(indent=4)
+
+    def write_document(write: Callable[[bytes], None]):
+        # The same text as json.dumps(json_dict, indent=4), without holding all of it
+        for chunk in encoder.iterencode(json_dict):
+            write(chunk.encode("utf-8"))
+
+    stream_json_file(save_location, write_document, view_name, manifest)
+
+
+def _save_compact_json_file(
+    save_location, view_graph, view_name, config, manifest: OutputManifest = None
+):
+    project_name = config.get("name", "")
+    title = f"{project_name}-{view_name}"
+    stream_json_file(
+        save_location,
+        lambda write: write_compact_json(write, view_graph, title),
+        view_name,
+        manifest,
+    )
+
+
+def stream_json_file(
+    save_location: str,
+    write_document: Callable[[Callable[[bytes], None]], None],
+    view_name: str = None,
+    manifest: OutputManifest = None,
+):
+    """
+    Streams the document :param write_document: writes to a temporary file, hashing it on
+    the way, and moves it to :param save_location: unless a :param manifest: knows the
+    content already.
+    """
     os.makedirs(os.path.dirname(save_location), exist_ok=True)
-    with open(save_location, "w") as f:
-        json.dump(json_dict, f, indent=4)
+    tmp_file = f"{save_location}.{os.getpid()}.{threading.get_ident()}.tmp"
+    digest = hashlib.sha256()
+    try:
+        with open(tmp_file, "wb") as f:
+
+            def write(chunk: bytes):
+                f.write(chunk)
+                digest.update(chunk)
+
+            write_document(write)
+    except BaseException:
+        os.remove(tmp_file)
+        raise
+
+    if manifest is not None and manifest.unchanged(
+        save_location, digest.hexdigest(), view_name
+    ):
+        os.remove(tmp_file)
+        return
+    os.replace(tmp_file, save_location)
+    if manifest is not None:
+        manifest.record(save_location, digest.hexdigest(), view_name)
+
+
+def write_compact_json(
+    write: Callable[[bytes], None], view_graph: list[ViewPackage], title: str
+):
+    """
+    Writes the compact document of a view to :param write:, one dependency at a time.
+
+    `fromPackage` and `toPackage` of an edge are indexes into `packages`, and every relation
+    is a pair of indexes into `files`, a table of `[name, path]` of every file the relations
+    refer to. The table comes last, as it is only complete once every edge was written.
+    """
+    encode = json_encoder()
+    packages = [package.render_package_json() for package in view_graph]
+    package_indexes = {package["name"]: index for index, package in enumerate(packages)}
+    file_indexes: dict[str, int] = {}
+    files = []
+
+    def file_index(bt_file) -> int:
+        index = file_indexes.get(bt_file.file)
+        if index is None:
+            index = file_indexes[bt_file.file] = len(files)
+            files.append([bt_file.label, bt_file.file])
+        return index
+
+    write(b'{"version":%d,"title":' % COMPACT_FORMAT_VERSION)
+    write(encode(title))
+    write(b',"packages":')
+    write(encode(packages))
+    write(b',"edges":[')
+    separator = b""
+    for package in view_graph:
+        for dependency in package.view_dependency_list:
+            edge = dependency.render_json_edge()
+            edge["fromPackage"] = package_indexes[edge["fromPackage"]]
+            edge["toPackage"] = package_indexes[edge["toPackage"]]
+            edge["relations"] = [
+                [file_index(from_file), file_index(to_file)]
+                for from_file, to_file in dependency.edge_files
+            ]
+            write(separator)
+            write(encode(edge))
+            separator = b","
+    write(b'],"files":')
+    write(encode(files))
+    write(b"}")
+
+
+def json_encoder() -> Callable[[object], bytes]:
+    """orjson when it is installed, the standard library otherwise. Both write the same bytes."""
+    if orjson is not None:
+        return orjson.dumps
+    encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+    return lambda value: encoder.encode(value).encode("utf-8")
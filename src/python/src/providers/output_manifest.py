@@ -0,0 +1,85 @@
+import hashlib
+import json
+import os
+import threading
+
+# Bump whenever the layout of the manifest changes
+MANIFEST_FORMAT_VERSION = 1
+MANIFEST_FILE_NAME = ".archlens-manifest.json"
+
+
+def content_hash(*parts: str) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class OutputManifest:
+    """
+    The hash of the rendered text behind every output file of :param save_location:, kept
+    between runs so views that did not change are neither written nor rendered again.
+
+    Savers ask `unchanged` before writing an output and `record` the outputs they write.
+    An output is only unchanged while its file still exists, so deleting a file (or the
+    manifest) renders it again. The views of a run may be saved on several threads.
+    """
+
+    def __init__(self, save_location: str) -> None:
+        self.save_location = save_location
+        self.updated_views: list[str] = []
+        self.unchanged_views: list[str] = []
+        self._hashes: dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    @property
+    def manifest_file(self) -> str:
+        return os.path.join(self.save_location, MANIFEST_FILE_NAME)
+
+    def unchanged(self, output_file: str, digest: str, view_name: str) -> bool:
+        """Whether :param output_file: exists and was rendered from text with :param digest:"""
+        name = self._name(output_file)
+        with self._lock:
+            if self._hashes.get(name) != digest or not os.path.exists(output_file):
+                return False
+            self.unchanged_views.append(view_name)
+            return True
+
+    def record(self, output_file: str, digest: str, view_name: str):
+        with self._lock:
+            self._hashes[self._name(output_file)] = digest
+            self.updated_views.append(view_name)
+
+    def save(self):
+        os.makedirs(self.save_location, exist_ok=True)
+        tmp_file = f"{self.manifest_file}.{os.getpid()}.tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(
+                {"version": MANIFEST_FORMAT_VERSION, "outputs": self._hashes},
+                f,
+                indent=4,
+                sort_keys=True,
+            )
+        os.replace(tmp_file, self.manifest_file)
+
+    def report(self):
+        if self.updated_views:
+            print(f"Updated views: {', '.join(sorted(self.updated_views))}")
+        if self.unchanged_views:
+            print(f"Unchanged views: {', '.join(sorted(self.unchanged_views))}")
+
+    def _name(self, output_file: str) -> str:
+        return os.path.relpath(output_file, self.save_location).replace(os.sep, "/")
+
+    def _load(self):
+        if not os.path.exists(self.manifest_file):
+            return
+        try:
+            with open(self.manifest_file, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == MANIFEST_FORMAT_VERSION:
+            self._hashes = data.get("outputs", {})
@@ -1,23 +1,36 @@
 import os
 
+from src.providers.output_manifest import OutputManifest
+from src.providers.plantuml.pu_server import PlantUMLRenderer, image_file
 from src.views.view_entities import ViewPackage
-import sys
 
 
-def save_plant_uml(view_graph, view_name, config):
+def save_plant_uml(
+    view_graph,
+    view_name,
+    config,
+    renderer: PlantUMLRenderer = None,
+    manifest: OutputManifest = None,
+):
     plant_uml_str = _render_pu_graph(view_graph, view_name, config)
     project_name = config["name"]
     save_location = os.path.join(config["saveLocation"], f"{project_name}-{view_name}")
-    _save_plantuml_str(save_location, plant_uml_str)
+    _save_plantuml_str(save_location, plant_uml_str, view_name, renderer, manifest)
 
 
-def save_plant_uml_diff(diff_graph, view_name, config):
+def save_plant_uml_diff(
+    diff_graph,
+    view_name,
+    config,
+    renderer: PlantUMLRenderer = None,
+    manifest: OutputManifest = None,
+):
     plant_uml_str = _render_pu_graph(diff_graph, view_name, config)
     project_name = config["name"]
     save_location = os.path.join(
         config["saveLocation"], f"{project_name}-diff-{view_name}"
     )
-    _save_plantuml_str(save_location, plant_uml_str)
+    _save_plantuml_str(save_location, plant_uml_str, view_name, renderer, manifest)
 
 
 def _render_pu_graph(view_graph: list[ViewPackage], view_name, config):
@@ -45,18 +58,29 @@ title {title}
     return uml_str
 
 
-def _save_plantuml_str(file_name: str, data: str):
-    os.makedirs(os.path.dirname(file_name), exist_ok=True)
-    with open(file_name, "w") as f:
-        f.write(data)
-    python_executable = sys.executable
-    plantuml_server = os.getenv(
-        "PLANTUML_SERVER_URL",
-        "https://www.plantuml.com/plantuml/img/",
-    )
-    os.system(
-        f"{python_executable} -m plantuml --server {plantuml_server}  {file_name}"
-    )
+def _save_plantuml_str(
+    file_name: str,
+    data: str,
+    view_name: str = None,
+    renderer: PlantUMLRenderer = None,
+    manifest: OutputManifest = None,
+):
+    """
+    Renders :param data: to the image of :param file_name:. With a :param renderer: the
+    diagram is only collected, the caller renders all diagrams of the run at once. With a
+    :param manifest: the diagram is only rendered when its source changed.
+    """
+    render_now = renderer is None
+    if render_now:
+        renderer = PlantUMLRenderer()
+
+    if manifest is not None:
+        digest = renderer.key(data)
+        if manifest.unchanged(image_file(file_name), digest, view_name):
+            return
+        # A failed render removes the image, so the diagram is rendered again next run
+        manifest.record(image_file(file_name), digest, view_name)
 
-    if os.path.exists(file_name):
-        os.remove(file_name)
+    renderer.add(file_name, data)
+    if render_now:
+        renderer.render()
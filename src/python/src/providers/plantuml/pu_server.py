@@ -0,0 +1,177 @@
+import base64
+import hashlib
+import os
+import shutil
+import string
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_SERVER_URL = "https://www.plantuml.com/plantuml/img/"
+# Folder of the cache dir that keeps rendered images by the hash of their source
+IMAGES_FOLDER = "plantuml-images"
+# Requests sent to the server at the same time, over as many kept-alive connections
+DEFAULT_CONNECTIONS = 4
+
+_PLANTUML_ALPHABET = (
+    string.digits + string.ascii_uppercase + string.ascii_lowercase + "-_"
+)
+_BASE64_ALPHABET = (
+    string.ascii_uppercase + string.ascii_lowercase + string.digits + "+/"
+)
+_BASE64_TO_PLANTUML = bytes.maketrans(
+    _BASE64_ALPHABET.encode("ascii"), _PLANTUML_ALPHABET.encode("ascii")
+)
+
+
+def server_url() -> str:
+    return os.getenv("PLANTUML_SERVER_URL", DEFAULT_SERVER_URL)
+
+
+def encode_source(source: str) -> str:
+    """:param source: deflated and encoded the way PlantUML servers read it from a URL"""
+    # Raw deflate, without the zlib header and checksum
+    compressor = zlib.compressobj(
+        zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -zlib.MAX_WBITS
+    )
+    deflated = compressor.compress(source.encode("utf-8")) + compressor.flush()
+    return base64.b64encode(deflated).translate(_BASE64_TO_PLANTUML).decode("ascii")
+
+
+def image_file(source_file: str) -> str:
+    """The PNG rendered for :param source_file:, named like `python -m plantuml` names it"""
+    return os.path.splitext(source_file)[0] + ".png"
+
+
+class PlantUMLRenderer:
+    """
+    Renders PlantUML diagrams to PNG images with a PlantUML server.
+
+    Diagrams are collected with `add` while the views of a run are saved, and `render`
+    requests them all at once, at most :param connections: at a time over one pooled
+    keep-alive session. Diagrams with the same source are requested once. With a
+    :param cache_dir: images are kept there by the hash of the server and the source,
+    and a diagram whose image is cached is not requested again.
+    """
+
+    def __init__(
+        self,
+        url: str = None,
+        cache_dir: str = None,
+        connections: int = DEFAULT_CONNECTIONS,
+    ) -> None:
+        self.url = url or server_url()
+        self.cache_dir = cache_dir
+        self.connections = max(connections, 1)
+        self.rendered = 0
+        self.cached = 0
+        self.failed = 0
+        # source hash -> (source, image files)
+        self._diagrams: dict[str, tuple[str, list[str]]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, source_file: str, source: str):
+        """Renders :param source: to the image of :param source_file: on the next `render`"""
+        key = self.key(source)
+        with self._lock:
+            self._diagrams.setdefault(key, (source, []))[1].append(
+                image_file(source_file)
+            )
+
+    def key(self, source: str) -> str:
+        """Hash of the server and :param source:, the image depends on both"""
+        digest = hashlib.sha256(self.url.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(source.encode("utf-8"))
+        return digest.hexdigest()
+
+    def render(self):
+        """Renders every diagram added since the last call"""
+        with self._lock:
+            diagrams, self._diagrams = self._diagrams, {}
+        if not diagrams:
+            return
+
+        pending = {}
+        for key, (source, image_files) in diagrams.items():
+            if self._copy_cached_image(key, image_files):
+                self.cached += 1
+            else:
+                pending[key] = (source, image_files)
+
+        if pending:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            with requests.Session() as session:
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.connections)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                with ThreadPoolExecutor(
+                    max_workers=min(self.connections, len(pending))
+                ) as executor:
+                    results = executor.map(
+                        lambda item: self._request(session, *item), pending.items()
+                    )
+                    for rendered in results:
+                        if rendered:
+                            self.rendered += 1
+                        else:
+                            self.failed += 1
+
+        print(
+            f"plantuml: {self.rendered} rendered, {self.cached} from cache, {self.failed} failed"
+        )
+
+    def _request(self, session, key: str, diagram: tuple[str, list[str]]) -> bool:
+        import requests
+
+        source, image_files = diagram
+        try:
+            response = session.get(self.url + encode_source(source), timeout=60)
+        except requests.RequestException as e:
+            print(f"Could not render {', '.join(image_files)}: {e}")
+            _remove_stale_images(image_files)
+            return False
+
+        if response.status_code != 200:
+            # Like `python -m plantuml`, the error page of the server is kept next to the image
+            for file in image_files:
+                _write(os.path.splitext(file)[0] + "_error.html", response.content)
+            print(
+                f"Could not render {', '.join(image_files)}: HTTP {response.status_code}"
+            )
+            _remove_stale_images(image_files)
+            return False
+
+        for file in image_files:
+            _write(file, response.content)
+        if self.cache_dir:
+            _write(self._cached_image(key), response.content)
+        return True
+
+    def _copy_cached_image(self, key: str, image_files: list[str]) -> bool:
+        if not self.cache_dir or not os.path.exists(self._cached_image(key)):
+            return False
+        for file in image_files:
+            os.makedirs(os.path.dirname(file) or os.curdir, exist_ok=True)
+            shutil.copyfile(self._cached_image(key), file)
+        return True
+
+    def _cached_image(self, key: str) -> str:
+        return os.path.join(self.cache_dir, IMAGES_FOLDER, f"{key}.png")
+
+
+def _write(path: str, content: bytes):
+    os.makedirs(os.path.dirname(path) or os.curdir, exist_ok=True)
+    tmp_file = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_file, "wb") as f:
+        f.write(content)
+    os.replace(tmp_file, path)
+
+
+def _remove_stale_images(image_files: list[str]):
+    """The images of a previous run no longer show the diagram that failed to render"""
+    for file in image_files:
+        if os.path.exists(file):
+            os.remove(file)
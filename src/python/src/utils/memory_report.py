@@ -0,0 +1,59 @@
+import sys
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+class MemoryReport:
+    """
+    Peak memory of the phases of a run (discovery, dependency extraction, views, ...).
+
+    The peak of every phase is measured with tracemalloc, which only sees memory allocated by
+    Python in this process (not by parse worker processes), and printed together with the
+    peak resident set size of the process so far. Tracing slows the run down, so nothing is
+    measured unless the report is enabled.
+    """
+
+    enabled: bool = False
+
+    def __init__(self, enabled: bool = False) -> None:
+        self.enabled = enabled
+        # (phase, peak traced bytes)
+        self.phases: list[tuple[str, int]] = []
+
+    @contextmanager
+    def phase(self, name: str):
+        if not self.enabled:
+            yield
+            return
+
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        try:
+            yield
+        finally:
+            _, peak = tracemalloc.get_traced_memory()
+            if started_tracing:
+                tracemalloc.stop()
+            self.phases.append((name, peak))
+            print(f"memory: {name} peak {_format_size(peak)}{_format_max_rss()}")
+
+
+def _format_max_rss() -> str:
+    if resource is None:
+        return ""
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    if sys.platform != "darwin":
+        max_rss *= 1024
+    return f", max rss {_format_size(max_rss)}"
+
+
+def _format_size(size: int) -> str:
+    return f"{size / 2**20:.1f} MiB"
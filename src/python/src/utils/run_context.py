@@ -0,0 +1,39 @@
+from pathlib import Path
+from typing import NamedTuple
+
+
+class RunContext(NamedTuple):
+    """
+    Settings of one run that views read while they are built and rendered.
+
+    Created once from the config (and, for diffs, the config of the remote branch) and
+    never changed afterwards, so views rendered on different threads can share it.
+    """
+
+    show_dependency_count: bool
+    package_color: str
+    root_folder_path: str
+    # Root folder of the checkout of the remote branch, for diffs
+    git_root_folder_path: str = None
+
+    @classmethod
+    def from_config(cls, config: dict, git_config: dict = None) -> "RunContext":
+        return cls(
+            show_dependency_count=config.get("showDependencyCount", True),
+            package_color=config.get("packageColor", "#Azure"),
+            root_folder_path=_root_folder_path(config),
+            git_root_folder_path=_root_folder_path(git_config) if git_config else None,
+        )
+
+    def relative_path(self, path: str) -> str:
+        """:param path: relative to the root folder of the project it belongs to"""
+        try:
+            return Path(path).relative_to(self.root_folder_path).as_posix()
+        except ValueError:
+            if self.git_root_folder_path is None:
+                raise
+            return Path(path).relative_to(self.git_root_folder_path).as_posix()
+
+
+def _root_folder_path(config: dict) -> str:
+    return Path(config["_config_path"]).joinpath(config["rootFolder"]).as_posix()
@@ -0,0 +1,109 @@
+from src.core.ancestor_index import AncestorIndex
+from src.core.bt_graph import BTGraph
+from src.core.bt_module import BTFile, BTModule
+from src.core.module_dependency_matrix import ModuleDependencyMatrix
+from src.utils.run_context import RunContext
+from src.views.utils import get_view_package_path_from_bt_package
+from src.views.view_filter import PackagePathTrie
+
+
+class ProjectedDependencies:
+    """
+    The dependencies of a model rolled up to the packages of one view.
+
+    The counts are computed up front. The file pairs behind them are only grouped when a
+    renderer asks for them, and are read from the model's matrix rather than copied.
+    """
+
+    def __init__(
+        self,
+        matrix: ModuleDependencyMatrix,
+        groups: list[BTModule],
+        owner_groups: list[int],
+        target_groups: list[list[int]],
+    ) -> None:
+        self._matrix = matrix
+        self._group_numbers = {module: number for number, module in enumerate(groups)}
+        self._owner_groups = owner_groups
+        self._target_groups = target_groups
+        self._cells: dict[tuple[int, int], list[tuple[int, int]]] = None
+
+        counts = matrix.roll_up(owner_groups, target_groups, len(groups))
+        self.counts: dict[tuple[BTModule, BTModule], int] = {
+            (groups[owner], groups[target]): counts[(owner, target)]
+            for owner, target in sorted(counts)
+        }
+
+    def edge_files(
+        self, from_package: BTModule, to_package: BTModule
+    ) -> list[tuple[BTFile, BTFile]]:
+        """(from file, to file) of every file dependency counted from one package to another"""
+        if self._cells is None:
+            self._cells = self._matrix.group_cells(
+                self._owner_groups, self._target_groups
+            )
+        key = (self._group_numbers[from_package], self._group_numbers[to_package])
+        return self._matrix.cells_file_pairs(self._cells.get(key, []))
+
+
+class PackageDependencyModel:
+    """
+    Package level dependencies of a graph, computed once and shared by all its views.
+
+    A view is a projection of the model: the packages it shows are picked with a filter,
+    and `project` rolls the dependencies of the hidden packages up to the shown ones.
+    The model itself is never changed by a view.
+    """
+
+    def __init__(self, graph: BTGraph, context: RunContext) -> None:
+        self.context = context
+        # Every package of the graph's scope, except the root of the scope
+        self.modules: list[BTModule] = list(graph.get_all_bt_modules_map().values())
+        self.paths: dict[BTModule, str] = {
+            module: get_view_package_path_from_bt_package(module, context)
+            for module in self.modules
+        }
+        self.root_packages: set[BTModule] = {
+            module
+            for module in self.modules
+            if module.parent_module is not None
+            and module.parent_module not in self.paths
+            and get_view_package_path_from_bt_package(module.parent_module, context)
+            == "."
+        }
+
+        self.path_trie = PackagePathTrie(self.paths)
+
+        self.matrix = ModuleDependencyMatrix(self.modules, graph.dependencies)
+        self.ancestors = AncestorIndex(self.modules)
+
+    def project(self, visible: set[BTModule]) -> ProjectedDependencies:
+        """
+        Rolls the dependencies up to the :param visible: packages.
+
+        A dependency of a module is counted from the nearest visible package containing the
+        module (the module itself or one of its parents). It is counted to the module it
+        points to, if that is visible, and to each of that module's visible parents, except
+        to the package it is counted from. Every file dependency is counted once per pair.
+        """
+        # Visible packages are numbered in the order of the model's modules
+        groups = [module for module in self.modules if module in visible]
+        group_numbers = {
+            self.matrix.positions[module]: number
+            for number, module in enumerate(groups)
+        }
+
+        # Nearest visible package of every module, and of every visible package the chain of
+        # groups made of itself and its visible parents, shared by the modules it owns
+        nearest = self.ancestors.nearest_marked(set(group_numbers))
+        chains: dict[int, list[int]] = {-1: []}
+        for position in self.ancestors.tour:
+            if nearest[position] == position:
+                parent = self.ancestors.parents[position]
+                parent_chain = chains[nearest[parent] if parent >= 0 else -1]
+                chains[position] = [group_numbers[position]] + parent_chain
+
+        owner_groups = [group_numbers.get(owner, -1) for owner in nearest]
+        target_groups = [chains[owner] for owner in nearest]
+
+        return ProjectedDependencies(self.matrix, groups, owner_groups, target_groups)
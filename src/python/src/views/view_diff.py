@@ -0,0 +1,167 @@
+from typing import NamedTuple
+
+from src.views.view_entities import EntityState, ViewDependancy, ViewPackage
+
+
+class DependencyDiff(NamedTuple):
+    from_path: str
+    to_path: str
+    # 0 when the dependency is only on the other side
+    count: int
+    remote_count: int
+
+    @property
+    def delta(self) -> int:
+        return self.count - self.remote_count
+
+
+class ViewDiff(NamedTuple):
+    """
+    The difference between the local and the remote graph of a view, by package path.
+
+    `dependencies` holds every dependency of either graph: the local ones in the order of the
+    local graph, then the ones only in the remote graph in the order of the remote graph.
+    """
+
+    added_packages: tuple[str, ...]
+    removed_packages: tuple[str, ...]
+    dependencies: tuple[DependencyDiff, ...]
+
+    @property
+    def added_dependencies(self) -> list[DependencyDiff]:
+        return [
+            dependency
+            for dependency in self.dependencies
+            if dependency.remote_count == 0
+        ]
+
+    @property
+    def removed_dependencies(self) -> list[DependencyDiff]:
+        return [dependency for dependency in self.dependencies if dependency.count == 0]
+
+    @property
+    def changed_dependencies(self) -> list[DependencyDiff]:
+        return [
+            dependency
+            for dependency in self.dependencies
+            if dependency.count and dependency.remote_count and dependency.delta
+        ]
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(
+            self.added_packages
+            or self.removed_packages
+            or any(dependency.delta for dependency in self.dependencies)
+        )
+
+
+def diff_view_graphs(
+    local_graph: dict[str, ViewPackage], remote_graph: dict[str, ViewPackage]
+) -> ViewDiff:
+    """Compares two graphs of a view (path -> package) without changing them"""
+    local_counts = _dependency_counts(local_graph)
+    remote_counts = _dependency_counts(remote_graph)
+
+    dependencies = [
+        DependencyDiff(
+            from_path, to_path, count, remote_counts.get((from_path, to_path), 0)
+        )
+        for (from_path, to_path), count in local_counts.items()
+    ]
+    dependencies.extend(
+        DependencyDiff(from_path, to_path, 0, remote_count)
+        for (from_path, to_path), remote_count in remote_counts.items()
+        if (from_path, to_path) not in local_counts
+    )
+    return ViewDiff(
+        added_packages=tuple(path for path in local_graph if path not in remote_graph),
+        removed_packages=tuple(
+            path for path in remote_graph if path not in local_graph
+        ),
+        dependencies=tuple(dependencies),
+    )
+
+
+def diff_view_packages(
+    diff: ViewDiff,
+    local_graph: dict[str, ViewPackage],
+    remote_graph: dict[str, ViewPackage],
+) -> list[ViewPackage]:
+    """
+    The packages renderers draw for a diff: added packages, then removed packages, then
+    the packages on both sides. They are copies, the graphs of the view are not changed.
+
+    Dependencies of added and removed packages take the state of their package. Between
+    packages on both sides, added, removed and changed dependencies are labelled with the
+    local count and the change.
+    """
+    added_packages = set(diff.added_packages)
+    removed_packages = set(diff.removed_packages)
+    packages: dict[str, ViewPackage] = {}
+    for path in diff.added_packages:
+        packages[path] = _copy_package(local_graph[path], EntityState.CREATED)
+    for path in diff.removed_packages:
+        packages[path] = _copy_package(remote_graph[path], EntityState.DELETED)
+    for path, package in local_graph.items():
+        if path not in added_packages:
+            packages[path] = _copy_package(package, EntityState.NEUTRAL)
+
+    local_dependencies = _dependencies(local_graph)
+    remote_dependencies = _dependencies(remote_graph)
+    for dependency_diff in diff.dependencies:
+        key = (dependency_diff.from_path, dependency_diff.to_path)
+        source = (
+            local_dependencies[key]
+            if dependency_diff.count
+            else remote_dependencies[key]
+        )
+        from_package = packages[dependency_diff.from_path]
+        dependency = source.moved(from_package, packages[dependency_diff.to_path])
+
+        if dependency_diff.from_path in added_packages:
+            dependency.state = EntityState.CREATED
+        elif dependency_diff.from_path in removed_packages:
+            dependency.state = EntityState.DELETED
+        elif dependency_diff.delta:
+            if dependency_diff.count == 0:
+                dependency.state = EntityState.DELETED
+            dependency.render_diff = {
+                "from_package": dependency.from_package,
+                "to_package": dependency.to_package,
+                "color": EntityState.CREATED
+                if dependency_diff.delta > 0
+                else EntityState.DELETED,
+                "label": _diff_label(dependency_diff),
+            }
+        from_package.view_dependency_list.append(dependency)
+
+    return list(packages.values())
+
+
+def _diff_label(dependency_diff: DependencyDiff) -> str:
+    sign = "+" if dependency_diff.delta > 0 else ""
+    return f"{dependency_diff.count} ({sign}{dependency_diff.delta})"
+
+
+def _dependency_counts(graph: dict[str, ViewPackage]) -> dict[tuple[str, str], int]:
+    return {
+        key: dependency.dependency_count
+        for key, dependency in _dependencies(graph).items()
+    }
+
+
+def _dependencies(
+    graph: dict[str, ViewPackage]
+) -> dict[tuple[str, str], ViewDependancy]:
+    return {
+        (path, dependency.to_package.path): dependency
+        for path, package in graph.items()
+        for dependency in package.view_dependency_list
+    }
+
+
+def _copy_package(package: ViewPackage, state: EntityState) -> ViewPackage:
+    copy = ViewPackage(package.bt_package, package.context, package.path)
+    copy.state = state
+    return copy
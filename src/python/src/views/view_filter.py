@@ -0,0 +1,136 @@
+import re
+
+from src.core.bt_module import BTModule
+
+
+class _TrieNode:
+    __slots__ = ("children", "module")
+
+    def __init__(self) -> None:
+        self.children: dict[str, _TrieNode] = {}
+        # None for folders on the way to a package that are not packages of the model
+        self.module: BTModule = None
+
+    def subtree(self) -> list[BTModule]:
+        modules = []
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node.module is not None:
+                modules.append(node.module)
+            stack.extend(node.children.values())
+        return modules
+
+    def at_depth(self, depth: int) -> list[BTModule]:
+        """Packages exactly :param depth: levels below this node"""
+        if depth < 0:
+            return []
+        level = [self]
+        for _ in range(depth):
+            level = [child for node in level for child in node.children.values()]
+        return [node.module for node in level if node.module is not None]
+
+
+class PackagePathTrie:
+    """
+    The packages of a graph by view path ("api/v1"), one trie level per folder, so a view
+    filter only visits the packages it selects.
+    """
+
+    def __init__(self, paths: dict[BTModule, str]) -> None:
+        self.root = _TrieNode()
+        for module, path in paths.items():
+            node = self.root
+            for segment in path.split("/"):
+                node = node.children.setdefault(segment, _TrieNode())
+            node.module = module
+
+    def find(self, path: str) -> _TrieNode:
+        node = self.root
+        for segment in path.split("/"):
+            node = node.children.get(segment)
+            if node is None:
+                return None
+        return node
+
+    def with_prefix(self, prefix: str) -> list[BTModule]:
+        """Packages whose path starts with :param prefix:, which may end mid folder name"""
+        *folders, partial = prefix.split("/")
+        node = self.root
+        for segment in folders:
+            node = node.children.get(segment)
+            if node is None:
+                return []
+        return [
+            module
+            for segment, child in node.children.items()
+            if segment.startswith(partial)
+            for module in child.subtree()
+        ]
+
+
+class ViewFilter:
+    """
+    The `packages` and `ignorePackages` of a view, compiled once.
+
+    `packages` entries are either a path prefix ("api") or a path with a depth
+    ({"path": "api", "depth": 1}) selecting the packages that many levels below it.
+    `ignorePackages` entries are a path prefix or, wrapped in stars ("*test*"), a part of
+    the path.
+    """
+
+    def __init__(self, view: dict) -> None:
+        self.prefixes: list[str] = []
+        # (path, depth)
+        self.depths: list[tuple[str, int]] = []
+        for package in view["packages"]:
+            if isinstance(package, str):
+                self.prefixes.append(package.replace(".", "/"))
+            elif isinstance(package, dict):
+                # TODO: why are we ignoring the star - it's a regex?
+                path = package["path"].replace(".", "/").replace("*", "")
+                self.depths.append((path, package["depth"]))
+        self.select_root_packages = len(view["packages"]) == 0
+
+        ignored = []
+        for ignore_package in view.get("ignorePackages", []):
+            ignore_package = ignore_package.replace(".", "/")
+            if ignore_package.startswith("*") and ignore_package.endswith("*"):
+                ignored.append(".*?" + re.escape(ignore_package[1:-1]))
+            else:
+                ignored.append(re.escape(ignore_package))
+        self.ignored = re.compile("|".join(ignored)) if ignored else None
+
+    def select(
+        self,
+        trie: PackagePathTrie,
+        root_packages: set[BTModule],
+        paths: dict[BTModule, str],
+    ) -> set[BTModule]:
+        if self.select_root_packages:
+            selected = set(root_packages)
+        else:
+            selected = set()
+
+        for prefix in self.prefixes:
+            selected.update(trie.with_prefix(prefix))
+
+        for path, depth in self.depths:
+            if path == "":
+                # {"path": "", "depth": N} selects the root packages down to depth N
+                for root_package in root_packages:
+                    selected.add(root_package)
+                    selected.update(trie.find(paths[root_package]).at_depth(depth - 1))
+                continue
+
+            node = trie.find(path)
+            if node is None or node.module is None:
+                continue
+            if depth == 0:
+                # A greater depth expands the path, which is then not part of the view
+                selected.add(node.module)
+            selected.update(node.at_depth(depth))
+
+        if self.ignored is None:
+            return selected
+        return {module for module in selected if not self.ignored.match(paths[module])}
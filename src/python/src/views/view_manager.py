@@ -1,22 +1,34 @@
 import sys
 from src.core.bt_graph import BTGraph
+from src.core.bt_module import BTModule
+from src.utils.run_context import RunContext
+from src.views.package_dependency_model import PackageDependencyModel
+from src.views.view_diff import diff_view_graphs, diff_view_packages
 from src.views.view_entities import (
     PACKAGE_NAME_SPLITTER,
-    EntityState,
+    ViewDependancy,
     ViewPackage,
 )
-from src.views.utils import get_view_package_path_from_bt_package
+from src.views.view_filter import ViewFilter
 import os
-from typing import Callable
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, TypeVar
+
+T = TypeVar("T")
 
 
 def render_views(
     graph: BTGraph,
     config: dict,
     save_to_file: Callable[[list[ViewPackage], str, dict], None],
+    context: RunContext,
 ):
-    views = _create_view_graphs(graph, config)
-    for view_name, view_package_map in views.items():
+    # The package dependencies are computed once, every view is a projection of them
+    model = PackageDependencyModel(graph, context)
+
+    def render_view(view_name: str):
+        view_package_map = _create_view_graph(model, config["views"][view_name])
         if os.getenv("MT_DEBUG"):
             dep_count = sum(
                 len(package.view_dependency_list)
@@ -35,12 +47,15 @@ def render_views(
 
         save_to_file(view_graph, view_name, config)
 
+    _map_views(config, render_view)
+
 
 def render_diff_views(
     local_bt_graph: BTGraph,
     remote_bt_graph: BTGraph,
     config: dict,
     save_to_file: Callable[[list[ViewPackage], str, dict], None],
+    context: RunContext,
 ) -> set[str]:
     """
     Renders diff views between local and remote graphs.
@@ -48,120 +63,60 @@ def render_diff_views(
     Returns:
         set[str]: Set of view names that have architectural changes.
     """
-    changed_views: set[str] = set()
-    local_graph_views = _create_view_graphs(local_bt_graph, config)
-    remote_graph_views = _create_view_graphs(remote_bt_graph, config)
-
-    for view_name, local_graph in local_graph_views.items():
-        diff_graph: list[ViewPackage] = []
-        remote_graph = remote_graph_views[view_name]
-        packages_to_skip_dependency_update: set[str] = set()
-        view_has_changes = False
-
-        # Created packages
-        for path, package in local_graph.items():
-            if path not in remote_graph:
-                package.state = EntityState.CREATED
-                for package_dependency in package.view_dependency_list:
-                    package_dependency.state = EntityState.CREATED
-                diff_graph.append(package)
-                view_has_changes = True
-
-        # Deleted packages
-        for remote_path, remote_package in remote_graph.items():
-            if remote_path not in local_graph:
-                remote_package.state = EntityState.DELETED
-                for remote_package_dependencies in remote_package.view_dependency_list:
-                    remote_package_dependencies.state = EntityState.DELETED
-                diff_graph.append(remote_package)
-                local_graph[remote_path] = remote_package
-                packages_to_skip_dependency_update.add(remote_path)
-                view_has_changes = True
-
-        # Change dependency state
-        for path, package in local_graph.items():
-            if path not in remote_graph or path in packages_to_skip_dependency_update:
-                continue  # We have already dealt with this case above
-            local_dependency_map = package.get_dependency_map()
-            remote_dependency_map = remote_graph[path].get_dependency_map()
-            for remote_key, remote_value in remote_dependency_map.items():
-                # Check if the same key exists in the local_dependency_map
-                if remote_key not in local_dependency_map:
-                    # we have a dependency that no longer exists in local, package exists but the dependency removed
-                    color = EntityState.DELETED
-                    dependency_count = 0 - remote_value.dependency_count
-                    remote_value = remote_dependency_map[remote_key]
-
-                    remote_dependency_map[remote_key].render_diff = {
-                        "from_package": remote_value.from_package,
-                        "to_package": remote_value.to_package,
-                        "color": color,
-                        "label": f"0 ({dependency_count})",
-                    }
-                    view_has_changes = True
-                    continue
+    local_model = PackageDependencyModel(local_bt_graph, context)
+    remote_model = PackageDependencyModel(remote_bt_graph, context)
+
+    def render_diff_view(view_name: str) -> bool:
+        view = config["views"][view_name]
+        return _render_diff_view(
+            view_name,
+            _create_view_graph(local_model, view),
+            _create_view_graph(remote_model, view),
+            config,
+            save_to_file,
+        )
 
-                local_value = local_dependency_map[remote_key]
+    view_has_changes = _map_views(config, render_diff_view)
+    return {view_name for view_name, has_changes in view_has_changes.items() if has_changes}
 
-                # Check if dependency counts are different
-                if remote_value.dependency_count != local_value.dependency_count:
-                    diff = local_value.dependency_count - remote_value.dependency_count
-                    sign = "+" if diff > 0 else ""
-                    color = EntityState.CREATED if diff > 0 else EntityState.DELETED
-                    dependency_count = (
-                        f"{local_value.dependency_count} ({sign}{diff})"
-                        if diff != 0
-                        else f"{local_value.dependency_count}"
-                    )
 
-                    local_dependency_map[remote_key].render_diff = {
-                        "from_package": local_value.from_package,
-                        "to_package": local_value.to_package,
-                        "color": color,
-                        "label": f"{dependency_count}",
-                    }
-                    view_has_changes = True
+def _map_views(config: dict, render_view: Callable[[str], T]) -> dict[str, T]:
+    """
+    Calls :param render_view: for every view of the config, on `viewJobs` threads.
 
-            # Created dependencies
-            for dependency_path, dependency in local_dependency_map.items():
-                if dependency_path not in remote_dependency_map:
-                    # we treat a new dependency as a diff
-                    color = EntityState.CREATED
-                    dependency_count = dependency.dependency_count
-                    dependency.render_diff = {
-                        "from_package": dependency.from_package,
-                        "to_package": dependency.to_package,
-                        "color": color,
-                        "label": f"{dependency_count} (+{dependency_count})",
-                    }
-                    view_has_changes = True
+    Views only read the graphs they are built from, so they can be built and saved at the
+    same time; saving a PlantUML view mostly waits for the PlantUML server.
+    """
+    view_names = list(config["views"])
+    view_jobs = config.get("viewJobs", 1)
+    if view_jobs == 0:
+        view_jobs = len(view_names)
+    if view_jobs <= 1 or len(view_names) <= 1:
+        return {view_name: render_view(view_name) for view_name in view_names}
 
-            # Deleted dependencies
-            for (
-                remote_dependency_path,
-                remote_dependency,
-            ) in remote_dependency_map.items():
-                if remote_dependency_path not in local_dependency_map:
-                    remote_dependency.state = EntityState.DELETED
-                    remote_dependency.from_package = package
-                    remote_dependency.to_package = local_graph[
-                        remote_dependency_path
-                    ]  # Ensures that the package refs will be in the final graph
-                    package.view_dependency_list.append(remote_dependency)
-                    view_has_changes = True
+    with ThreadPoolExecutor(max_workers=min(view_jobs, len(view_names))) as executor:
+        return dict(zip(view_names, executor.map(render_view, view_names)))
 
-            diff_graph.append(package)
 
-        view_config: dict = config["views"][view_name]
-        use_package_path_as_label = view_config.get("usePackagePathAsLabel", True)
-        if not use_package_path_as_label:
-            _handle_duplicate_name(diff_graph)
+def _render_diff_view(
+    view_name: str,
+    local_graph: dict[str, ViewPackage],
+    remote_graph: dict[str, ViewPackage],
+    config: dict,
+    save_to_file: Callable[[list[ViewPackage], str, dict], None],
+) -> bool:
+    diff = diff_view_graphs(local_graph, remote_graph)
+    if not diff.has_changes:
+        return False
 
-        if view_has_changes:
-            changed_views.add(view_name)
-            save_to_file(diff_graph, view_name, config)
+    diff_graph = diff_view_packages(diff, local_graph, remote_graph)
+    view_config: dict = config["views"][view_name]
+    use_package_path_as_label = view_config.get("usePackagePathAsLabel", True)
+    if not use_package_path_as_label:
+        _handle_duplicate_name(diff_graph)
 
-    return changed_views
+    save_to_file(diff_graph, view_name, config)
+    return True
 
 
 def _handle_duplicate_name(view_graph: list[ViewPackage]):
@@ -183,132 +138,35 @@ def _handle_duplicate_name(view_graph: list[ViewPackage]):
             package.name = package_name_split[-1]
 
 
-def _create_view_graphs(
-    graph: BTGraph, config: dict
-) -> dict[str, dict[str, ViewPackage]]:
-
-    # all the nodes at all kinds of lelves
-    bt_packages = graph.get_all_bt_modules_map()
-    views = {}
-
-    for view_name, view in config["views"].items():
-
-        viewpackages_by_name: dict[str, ViewPackage] = {}
-
-        for bt_package in bt_packages.values():
-
-            # create a view package node for each of the nodes in the AST
-            view_package = ViewPackage(bt_package)
-            viewpackages_by_name[view_package.path] = view_package
+def _create_view_graph(model: PackageDependencyModel, view: dict) -> dict[str, ViewPackage]:
+    return _create_view_packages(model, _filter_packages(model, view))
 
-        for view_package in viewpackages_by_name.values():
-            view_package.setup_dependencies(viewpackages_by_name)
 
-        viewpackages_by_name = _filter_packages(viewpackages_by_name, view)
-        views[view_name] = viewpackages_by_name
-    return views
-
-
-def _find_packages_with_depth(
-    package: ViewPackage, depth: int, view_package_map: dict[str, ViewPackage]
-):
-
-    bt_sub_packages = package.bt_package.get_submodules_recursive()
-    filtered_sub_packages = [
-        get_view_package_path_from_bt_package(sub_package)
-        for sub_package in bt_sub_packages
-        if (sub_package.depth - package.bt_package.depth) == depth
-    ]
-    return [view_package_map[p] for p in filtered_sub_packages]
-
-
-def _filter_packages(
-    packages_map: dict[str, ViewPackage], view: dict
+def _create_view_packages(
+    model: PackageDependencyModel, visible_packages: set[BTModule]
 ) -> dict[str, ViewPackage]:
-    all_viewpackages = list(packages_map.values())
-    filtered_packages_set: set[ViewPackage] = set()
-
-    # packages
-    for package_definition_from_config in view["packages"]:
-        for view_package in all_viewpackages:
-            filter_path = package_definition_from_config
-
-            # e.g.
-            # "packages": [
-            #      "api",
-            # ],
-            if isinstance(package_definition_from_config, str):
-                if view_package.path.startswith(filter_path.replace(".", "/")):
-                    filtered_packages_set.add(view_package)
-
-            # e.g.
-            # "packages": [
-            #     {
-            #         "path": "api",
-            #         "depth": 1
-            #     }
-            # ],
-            if isinstance(package_definition_from_config, dict):
-                filter_path = package_definition_from_config["path"].replace(".", "/")
-
-                # TODO: why are we ignoring the star - it's a regex?
-                filter_path = filter_path.replace("*", "")
-                view_depth = package_definition_from_config["depth"]
-
-                if filter_path == "" and view_package.is_root_package():
-                    # This happens when config specifies {"path": "", "depth": N}
-                    # to include all root packages up to depth N
-                    filtered_packages_set.add(view_package)
-
-                    depth_filter_packages = _find_packages_with_depth(
-                        view_package, view_depth - 1, packages_map
-                    )
-                    filtered_packages_set.update(depth_filter_packages)
-                elif view_package.path == filter_path:
-
-                    if view_depth == 0:
-                        # if view depth is greater, that means we want to expand this path
-                        # and this path should not be part of the view
-                        filtered_packages_set.add(view_package)
-
-                    depth_filter_packages = _find_packages_with_depth(
-                        view_package, view_depth, packages_map
-                    )
-                    filtered_packages_set.update(depth_filter_packages)
-
-    if len(view["packages"]) == 0:
-        # If no packages specified, only include root packages (those without a parent)
-        filtered_packages_set = set(
-            package for package in packages_map.values() 
-            if package.is_root_package()
+    view_packages = {
+        bt_package: ViewPackage(bt_package, model.context, model.paths[bt_package])
+        for bt_package in model.modules
+        if bt_package in visible_packages
+    }
+
+    dependencies = model.project(visible_packages)
+    for (from_bt_package, to_bt_package), count in dependencies.counts.items():
+        from_package = view_packages[from_bt_package]
+        from_package.view_dependency_list.append(
+            ViewDependancy(
+                from_package,
+                view_packages[to_bt_package],
+                count,
+                partial(dependencies.edge_files, from_bt_package, to_bt_package),
+            )
         )
+    return {package.path: package for package in view_packages.values()}
 
-    # ignorePackages
 
+def _filter_packages(model: PackageDependencyModel, view: dict) -> set[BTModule]:
     if not "ignorePackages" in view:
         view["ignorePackages"] = []
 
-    updated_filtered_packages_set: set = set()
-    for view_package in filtered_packages_set:
-        should_filter = False
-
-        for ignore_packages in view["ignorePackages"]:
-            ignore_packages = ignore_packages.replace(".", "/")
-            if ignore_packages.startswith("*") and ignore_packages.endswith("*"):
-                if ignore_packages[1:-1] in view_package.path:
-                    should_filter = True
-            else:
-                if view_package.path.startswith(ignore_packages):
-                    should_filter = True
-
-        if not should_filter:
-            updated_filtered_packages_set.add(view_package)
-
-    if len(view["ignorePackages"]) == 0:
-        updated_filtered_packages_set = filtered_packages_set
-
-    filtered_packages_set = updated_filtered_packages_set
-
-    for view_package in filtered_packages_set:
-        view_package.filter_excess_packages_dependencies(filtered_packages_set)
-    return {package.path: package for package in filtered_packages_set}
+    return ViewFilter(view).select(model.path_trie, model.root_packages, model.paths)
@@ -0,0 +1,105 @@
+import contextlib
+import io
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+from src.cli_interface import _create_astroid, read_config_file
+
+TESTS_FOLDER = os.path.dirname(os.path.abspath(__file__))
+PYTHON_ROOT = os.path.dirname(TESTS_FOLDER)
+FIXTURES_FOLDER = os.path.join(TESTS_FOLDER, "fixtures")
+
+GIT_IDENTITY = {
+    "GIT_AUTHOR_NAME": "ArchLens Tests",
+    "GIT_AUTHOR_EMAIL": "tests@archlens.invalid",
+    "GIT_COMMITTER_NAME": "ArchLens Tests",
+    "GIT_COMMITTER_EMAIL": "tests@archlens.invalid",
+}
+
+
+@pytest.fixture
+def shop_project(tmp_path) -> str:
+    """A copy of the `shop` fixture project, the folder of its archlens.json"""
+    project = os.path.join(tmp_path, "shop")
+    shutil.copytree(os.path.join(FIXTURES_FOLDER, "shop"), project)
+    return project
+
+
+@pytest.fixture
+def shop_config(shop_project) -> dict:
+    """The config of the `shop_project` copy, as read by the command line"""
+    return read_config_file(os.path.join(shop_project, "archlens.json"))
+
+
+@pytest.fixture
+def temp_folder(tmp_path) -> str:
+    """The folder archlens creates its temporary folders in"""
+    folder = os.path.join(tmp_path, "tmp")
+    os.makedirs(folder)
+    return folder
+
+
+@pytest.fixture
+def archlens(temp_folder):
+    """Runs the archlens command line in a new process, fails when it does"""
+
+    def run(*args: str) -> str:
+        result = subprocess.run(
+            [sys.executable, "-c", "from src.cli_interface import main; main()", *args],
+            cwd=PYTHON_ROOT,
+            env={**os.environ, "TMPDIR": temp_folder},
+            capture_output=True,
+            text=True,
+        )
+        assert result.returncode == 0, result.stdout + result.stderr
+        return result.stdout
+
+    return run
+
+
+def git(cwd: str, *args: str) -> str:
+    return subprocess.run(
+        ["git", *args],
+        cwd=cwd,
+        env={**os.environ, **GIT_IDENTITY},
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.strip()
+
+
+@pytest.fixture
+def run_git():
+    """`git` in a folder, with an identity to commit with"""
+    return git
+
+
+def build_graph(config: dict, source_tree=None):
+    """A graph built from :param config:, without the progress output"""
+    from src.core.bt_graph import BTGraph
+
+    graph = BTGraph(_create_astroid(), source_tree=source_tree)
+    with contextlib.redirect_stdout(io.StringIO()):
+        graph.build_graph(config)
+    return graph
+
+
+def describe_graph(graph, project_root: str) -> tuple[set, set]:
+    """Packages and file dependencies of a graph, by path relative to the project"""
+
+    def relative(path: str) -> str:
+        return os.path.relpath(path, project_root).replace(os.sep, "/")
+
+    modules = {
+        relative(module.path) for module in graph.get_all_bt_modules_map().values()
+    }
+    edges = {
+        (relative(bt_file.file), relative(target.file))
+        for bt_file in graph.get_all_bt_files_map().values()
+        for target in bt_file.edge_to
+    }
+    return modules, edges
@@ -0,0 +1,4 @@
+from shop.core.models import user
+from shop.util import helpers
+
+ROUTES = {"users": user.User, "thing": helpers.thing}
@@ -0,0 +1,5 @@
+from shop.api.v1 import endpoints
+from shop.core.models.user import User
+from shop.util.text import slug
+
+ADMIN = (endpoints.ENDPOINTS, User, slug("Admin"))
@@ -0,0 +1,5 @@
+from shop.api import routes
+from shop.core.models.billing import invoice
+from shop.core.models.user import User
+
+ENDPOINTS = [routes.ROUTES, User, invoice.Invoice]
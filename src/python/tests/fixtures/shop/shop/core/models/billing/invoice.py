@@ -0,0 +1,7 @@
+from shop.core.models.user import User
+from shop.util import text
+
+
+class Invoice:
+    owner = User
+    label = text.slug("Invoice")
@@ -0,0 +1,5 @@
+from shop.util.helpers import thing
+
+
+class User:
+    default = thing
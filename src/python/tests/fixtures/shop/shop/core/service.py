@@ -0,0 +1,5 @@
+import shop.util.helpers
+
+from .models import user
+
+SERVICE = (user.User, shop.util.helpers.thing)
@@ -0,0 +1,4 @@
+from shop.api import routes
+from shop.core import service
+
+APP = (routes, service)
@@ -0,0 +1,3 @@
+import shop.core
+
+CORE = shop.core
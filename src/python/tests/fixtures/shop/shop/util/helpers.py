@@ -0,0 +1 @@
+thing = 1
@@ -0,0 +1,2 @@
+def slug(value):
+    return value.lower()
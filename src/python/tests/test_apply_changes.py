@@ -0,0 +1,118 @@
+"""
+Changes the `shop` fixture project step by step and checks after every step that the
+graph updated with `BTGraph.apply_changes` equals a graph built again from the files.
+"""
+import contextlib
+import io
+import os
+import shutil
+
+import pytest
+
+from conftest import build_graph, describe_graph
+
+
+def _write(project: str, files: dict[str, str]) -> list[str]:
+    paths = []
+    for path, content in files.items():
+        full_path = os.path.join(project, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "w") as f:
+            f.write(content)
+        paths.append(full_path)
+    return paths
+
+
+def _delete(project: str, paths: list[str]) -> list[str]:
+    """Deletes files and folders, returns every deleted file"""
+    deleted = []
+    for path in paths:
+        full_path = os.path.join(project, path)
+        if os.path.isdir(full_path):
+            for folder, _, file_names in os.walk(full_path):
+                deleted.extend(os.path.join(folder, name) for name in file_names)
+            shutil.rmtree(full_path)
+        else:
+            os.remove(full_path)
+            deleted.append(full_path)
+    return deleted
+
+
+@pytest.fixture(params=["astroid", "ast"])
+def config(shop_config, request) -> dict:
+    return {**shop_config, "importEngine": request.param}
+
+
+@pytest.fixture
+def apply(config):
+    """Applies a change to a built graph and compares the graph with a fresh build"""
+    project = config["_config_path"]
+    graph = build_graph(config)
+
+    def run(added=None, modified=None, deleted=None) -> list[str]:
+        with contextlib.redirect_stdout(io.StringIO()):
+            analysed = graph.apply_changes(added, modified, deleted)
+        assert describe_graph(graph, project) == describe_graph(
+            build_graph(config), project
+        )
+        return analysed
+
+    run.graph = graph
+    return run
+
+
+def test_modify_files(apply, shop_project):
+    modified = _write(
+        shop_project,
+        {
+            "shop/api/v1/endpoints.py": (
+                "from shop.core import service\n\nENDPOINTS = [service.SERVICE]\n"
+            ),
+            "shop/util/text.py": "from shop.util import helpers\n\nSLUG = helpers\n",
+        },
+    )
+    assert sorted(apply(modified=modified)) == sorted(modified)
+
+
+def test_add_and_delete_files(apply, shop_project):
+    # The import does not resolve until the file it names is added
+    apply(
+        modified=_write(
+            shop_project,
+            {"shop/core/service.py": "import shop.util.dates\n\nSERVICE = shop.util\n"},
+        )
+    )
+    added = _write(shop_project, {"shop/util/dates.py": "TODAY = None\n"})
+    service = os.path.join(shop_project, "shop/core/service.py")
+    assert sorted(apply(added=added)) == sorted([*added, service])
+
+    apply(deleted=_delete(shop_project, ["shop/util/text.py", "shop/util/dates.py"]))
+
+
+def test_add_and_delete_packages(apply, shop_project):
+    added = _write(
+        shop_project,
+        {
+            "shop/payments/__init__.py": "",
+            "shop/payments/gateway.py": "from shop.core.models.user import User\n",
+            "shop/payments/cards/__init__.py": "",
+            "shop/payments/cards/visa.py": "from shop.payments import gateway\n",
+        },
+    )
+    apply(added=added)
+    apply(deleted=_delete(shop_project, ["shop/core/models/billing"]))
+    apply(deleted=_delete(shop_project, ["shop/payments/cards"]))
+
+
+def test_delete_init_file(apply, shop_project):
+    # Without its `__init__.py` the folder is no package, its files leave the graph
+    apply(deleted=_delete(shop_project, ["shop/api/v1/admin/__init__.py"]))
+    assert os.path.exists(os.path.join(shop_project, "shop/api/v1/admin/users.py"))
+    apply(deleted=_delete(shop_project, ["shop/core/models/__init__.py"]))
+
+
+def test_delete_root_package(apply, shop_project):
+    with pytest.raises(ValueError):
+        apply.graph.apply_changes(
+            deleted=[os.path.join(shop_project, "shop/__init__.py")]
+        )
@@ -0,0 +1,86 @@
+"""
+Keeps the base branch of a `file://` remote under tmp_path in a mirror of the cache dir.
+"""
+import hashlib
+import os
+import shutil
+
+import git
+import pytest
+
+from src.git_integration.fetch_git import MIRRORS_FOLDER, update_mirror
+
+BRANCH = "main"
+
+
+@pytest.fixture
+def remote(tmp_path, run_git):
+    """
+    A bare remote with a commit on `main`, and `commit()` pushing a new one to it.
+    Returns the url of the remote and `commit()`.
+    """
+    bare_repo = os.path.join(tmp_path, "remote.git")
+    work_folder = os.path.join(tmp_path, "work")
+    run_git(tmp_path, "init", "-q", "--bare", bare_repo)
+    run_git(tmp_path, "init", "-q", "-b", BRANCH, work_folder)
+
+    def commit() -> str:
+        count = len(os.listdir(work_folder))
+        with open(os.path.join(work_folder, f"file{count}.py"), "w") as f:
+            f.write(f"VALUE = {count}\n")
+        run_git(work_folder, "add", "--all")
+        run_git(work_folder, "commit", "-q", "-m", f"commit {count}")
+        run_git(work_folder, "push", "-q", bare_repo, BRANCH)
+        return run_git(work_folder, "rev-parse", "HEAD")
+
+    commit()
+    return f"file://{bare_repo}", commit
+
+
+def _tip(mirror: git.Repo) -> str:
+    return mirror.git.rev_parse(f"refs/heads/{BRANCH}")
+
+
+def test_first_run_creates_mirror(tmp_path, remote):
+    url, commit = remote
+    cache_dir = os.path.join(tmp_path, "cache")
+    tip = commit()
+
+    mirror = update_mirror(cache_dir, url, BRANCH)
+
+    name = hashlib.sha256(url.encode("utf-8")).hexdigest()[:16]
+    assert mirror.git_dir == os.path.join(cache_dir, MIRRORS_FOLDER, f"{name}.git")
+    assert mirror.bare
+    assert _tip(mirror) == tip
+    assert mirror.git.rev_parse("--is-shallow-repository") == "true"
+
+
+def test_second_run_fetches_new_tip(tmp_path, remote):
+    url, commit = remote
+    cache_dir = os.path.join(tmp_path, "cache")
+    first_tip = _tip(update_mirror(cache_dir, url, BRANCH))
+
+    new_tip = commit()
+    mirror = update_mirror(cache_dir, url, BRANCH)
+
+    assert new_tip != first_tip
+    assert _tip(mirror) == new_tip
+
+
+def test_failing_fetch_uses_mirrored_branch(tmp_path, remote, capsys):
+    url, commit = remote
+    cache_dir = os.path.join(tmp_path, "cache")
+    tip = _tip(update_mirror(cache_dir, url, BRANCH))
+
+    commit()
+    shutil.rmtree(os.path.join(tmp_path, "remote.git"))
+    mirror = update_mirror(cache_dir, url, BRANCH)
+
+    assert _tip(mirror) == tip
+    assert "using the mirrored branch" in capsys.readouterr().out
+
+
+def test_failing_fetch_without_mirror_raises(tmp_path, remote):
+    url, _ = remote
+    with pytest.raises(git.GitCommandError):
+        update_mirror(os.path.join(tmp_path, "cache"), url, "missing")
@@ -0,0 +1,94 @@
+"""
+Commits the `shop` fixture project into a bare repository and reads it back with a
+GitTree, as the diff commands read the base branch.
+"""
+import os
+import subprocess
+
+import git
+import pytest
+
+from conftest import GIT_IDENTITY, build_graph, describe_graph
+from src.core.source_tree import SourceTree
+from src.git_integration.git_tree import GitTree
+
+SUBMODULE_COMMIT = "1" * 40
+
+
+def _commit_folder(folder: str, bare_repo: str, *index_entries: str) -> str:
+    """
+    Commits every file of :param folder: into a new bare repository, with the extra
+    `mode,object,path` :param index_entries:, returns the commit
+    """
+    env = {**os.environ, **GIT_IDENTITY, "GIT_DIR": bare_repo, "GIT_WORK_TREE": folder}
+
+    def run(*args: str):
+        subprocess.run(["git", *args], cwd=folder, env=env, check=True)
+
+    subprocess.run(["git", "init", "-q", "--bare", bare_repo], check=True)
+    run("add", "-A", "-f", ".")
+    for index_entry in index_entries:
+        run("update-index", "--add", "--cacheinfo", index_entry)
+    run("commit", "-q", "-m", "snapshot")
+    return git.Repo(bare_repo).git.rev_parse("HEAD")
+
+
+@pytest.mark.parametrize("import_engine", ["astroid", "ast"])
+def test_graph_equals_disk_build(shop_config, tmp_path, import_engine):
+    config = {**shop_config, "importEngine": import_engine}
+    bare_repo = os.path.join(tmp_path, "repo.git")
+    revision = _commit_folder(config["_config_path"], bare_repo)
+
+    tree_root = os.path.join(tmp_path, "tree")
+    tree = GitTree(git.Repo(bare_repo), revision, tree_root)
+    tree_graph = build_graph({**config, "_config_path": tree_root}, tree)
+
+    assert describe_graph(tree_graph, tree_root) == describe_graph(
+        build_graph(config), config["_config_path"]
+    )
+    # Every file was read from the object database
+    assert not os.path.exists(tree_root)
+
+
+def test_skips_symlinks_and_submodules(shop_project, tmp_path):
+    os.symlink("text.py", os.path.join(shop_project, "shop/util/alias.py"))
+    bare_repo = os.path.join(tmp_path, "repo.git")
+    revision = _commit_folder(
+        shop_project, bare_repo, f"160000,{SUBMODULE_COMMIT},shop/vendor"
+    )
+    listing = git.Repo(bare_repo).git.ls_tree("-r", "--name-only", revision)
+    assert {"shop/util/alias.py", "shop/vendor"} <= set(listing.split("\n"))
+
+    tree_root = os.path.join(tmp_path, "tree")
+    tree = GitTree(git.Repo(bare_repo), revision, tree_root)
+    names = [entry.name for entry in tree.list_folder(os.path.join(tree_root, "shop"))]
+    assert "vendor" not in names
+    util_folder = os.path.join(tree_root, "shop/util")
+    assert "alias.py" not in [entry.name for entry in tree.list_folder(util_folder)]
+    assert not tree.is_file(os.path.join(util_folder, "alias.py"))
+    assert tree.is_file(os.path.join(util_folder, "text.py"))
+
+
+def test_missing_paths(shop_project, tmp_path):
+    bare_repo = os.path.join(tmp_path, "repo.git")
+    revision = _commit_folder(shop_project, bare_repo)
+    tree_root = os.path.join(tmp_path, "tree")
+    tree = GitTree(git.Repo(bare_repo), revision, tree_root, prefix="shop/util")
+
+    text_file = os.path.join(tree_root, "shop/util/text.py")
+    assert tree.read(text_file) == SourceTree().read(
+        os.path.join(shop_project, "shop/util/text.py")
+    )
+    assert tree.content_id(text_file) == SourceTree().content_id(
+        os.path.join(shop_project, "shop/util/text.py")
+    )
+
+    # Only the files below the prefix are listed
+    outside_file = os.path.join(tree_root, "shop/main.py")
+    with pytest.raises(FileNotFoundError):
+        tree.list_folder(os.path.join(tree_root, "shop/api"))
+    with pytest.raises(FileNotFoundError):
+        tree.read(outside_file)
+    with pytest.raises(FileNotFoundError):
+        tree.content_id(outside_file)
+    assert not tree.is_file(outside_file)
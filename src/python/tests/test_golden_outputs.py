@@ -0,0 +1,103 @@
+"""
+Renders the `shop` fixture project and compares every JSON view with `golden/`.
+
+Absolute paths in the outputs are replaced by `<project>`, and by `<base>` for the files
+of the base branch, so the outputs do not depend on where the project is. After an
+intended change of the views, regenerate the outputs with
+
+    ARCHLENS_UPDATE_GOLDEN=1 python -m pytest tests/test_golden_outputs.py
+"""
+import json
+import os
+import re
+import shutil
+
+import pytest
+
+GOLDEN_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden")
+VIEWS = ["completeView", "all", "api", "core"]
+
+# The changes of the local branch rendered by the diff views
+CHANGED_FILES = {
+    "shop/payments/__init__.py": "",
+    "shop/payments/gateway.py": (
+        "from shop.core.models.user import User\n"
+        "\n"
+        "\n"
+        "class Gateway:\n"
+        "    customer = User\n"
+    ),
+    "shop/api/v1/endpoints.py": (
+        "from shop.api import routes\n"
+        "from shop.core.models.user import User\n"
+        "from shop.payments.gateway import Gateway\n"
+        "\n"
+        "ENDPOINTS = [routes.ROUTES, User, Gateway]\n"
+    ),
+    "shop/core/service.py": (
+        "from shop.payments import gateway\n"
+        "\n"
+        "from .models import user\n"
+        "\n"
+        "SERVICE = (user.User, gateway.Gateway)\n"
+    ),
+}
+DELETED_FOLDERS = ["shop/core/models/billing"]
+
+
+def _normalize(text: str, project: str, temp_folder: str) -> str:
+    text = re.sub(re.escape(temp_folder) + r"/tmp[^/\"]*(/base)?", "<base>", text)
+    return text.replace(project, "<project>")
+
+
+def _check_outputs(project: str, temp_folder: str, file_names: list[str]):
+    update = os.getenv("ARCHLENS_UPDATE_GOLDEN")
+    for file_name in file_names:
+        with open(os.path.join(project, "diagrams", file_name)) as f:
+            # The golden files end with a newline, the outputs do not
+            output = _normalize(f.read(), project, temp_folder) + "\n"
+        golden_file = os.path.join(GOLDEN_FOLDER, file_name)
+        if update:
+            with open(golden_file, "w") as f:
+                f.write(output)
+            continue
+        with open(golden_file) as f:
+            assert output == f.read(), f"{file_name} differs from the golden output"
+
+
+@pytest.mark.parametrize("import_engine", ["astroid", "ast"])
+def test_render_json(shop_project, temp_folder, archlens, import_engine):
+    archlens(
+        "render-json",
+        "--config-path",
+        os.path.join(shop_project, "archlens.json"),
+        "--import-engine",
+        import_engine,
+    )
+    _check_outputs(shop_project, temp_folder, [f"shop-{view}.json" for view in VIEWS])
+
+
+def test_render_diff_json(shop_project, temp_folder, archlens, run_git):
+    config_path = os.path.join(shop_project, "archlens.json")
+    with open(config_path) as f:
+        config = json.load(f)
+    config["github"]["url"] = shop_project
+    with open(config_path, "w") as f:
+        json.dump(config, f, indent=2)
+
+    run_git(shop_project, "init", "--quiet")
+    run_git(shop_project, "checkout", "--quiet", "-b", "main")
+    run_git(shop_project, "add", "--all")
+    run_git(shop_project, "commit", "--quiet", "-m", "base")
+    run_git(shop_project, "checkout", "--quiet", "-b", "feature")
+    for path, content in CHANGED_FILES.items():
+        os.makedirs(os.path.dirname(os.path.join(shop_project, path)), exist_ok=True)
+        with open(os.path.join(shop_project, path), "w") as f:
+            f.write(content)
+    for folder in DELETED_FOLDERS:
+        shutil.rmtree(os.path.join(shop_project, folder))
+
+    archlens("render-diff-json", "--config-path", config_path)
+    _check_outputs(
+        shop_project, temp_folder, [f"shop-diff-{view}.json" for view in VIEWS]
+    )
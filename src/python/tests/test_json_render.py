@@ -0,0 +1,58 @@
+"""
+Saving the standard JSON document of a view, with and without an output manifest.
+"""
+import json
+import os
+
+import pytest
+
+from src.providers.json.json_render import _save_json_file
+from src.providers.output_manifest import OutputManifest
+
+DOCUMENT = {
+    "title": "shop-all",
+    "packages": [{"name": "api", "state": "NEUTRAL"}, {"name": "core"}],
+    "edges": [{"fromPackage": "api", "toPackage": "core", "relations": []}],
+}
+
+
+def _read(path: str) -> str:
+    with open(path) as f:
+        return f.read()
+
+
+def test_writes_indented_json(tmp_path):
+    save_location = os.path.join(tmp_path, "diagrams", "shop-all.json")
+    _save_json_file(save_location, DOCUMENT)
+
+    assert _read(save_location) == json.dumps(DOCUMENT, indent=4)
+    assert os.listdir(os.path.dirname(save_location)) == ["shop-all.json"]
+
+
+def test_unchanged_document_is_not_written(tmp_path):
+    save_location = os.path.join(tmp_path, "shop-all.json")
+    manifest = OutputManifest(tmp_path)
+    _save_json_file(save_location, DOCUMENT, "all", manifest)
+    manifest.save()
+    modified_time = os.stat(save_location).st_mtime_ns
+
+    manifest = OutputManifest(tmp_path)
+    _save_json_file(save_location, DOCUMENT, "all", manifest)
+    assert (manifest.unchanged_views, manifest.updated_views) == (["all"], [])
+    assert os.stat(save_location).st_mtime_ns == modified_time
+
+    changed_document = {**DOCUMENT, "title": "shop-changed"}
+    _save_json_file(save_location, changed_document, "all", manifest)
+    assert manifest.updated_views == ["all"]
+    assert _read(save_location) == json.dumps(changed_document, indent=4)
+
+
+def test_failed_save_keeps_previous_file(tmp_path):
+    save_location = os.path.join(tmp_path, "shop-all.json")
+    _save_json_file(save_location, DOCUMENT)
+
+    with pytest.raises(TypeError):
+        _save_json_file(save_location, {**DOCUMENT, "edges": [object()]})
+
+    assert _read(save_location) == json.dumps(DOCUMENT, indent=4)
+    assert os.listdir(tmp_path) == ["shop-all.json"]
@@ -0,0 +1,140 @@
+"""
+Renders diagrams with PlantUMLRenderer against a local stub PlantUML server.
+"""
+import http.server
+import os
+import threading
+
+import pytest
+
+from src.providers.plantuml.pu_server import DEFAULT_CONNECTIONS, PlantUMLRenderer
+
+
+class StubPlantUMLServer(http.server.ThreadingHTTPServer):
+    """
+    Answers every `GET /img/<encoded source>` with a fake image, or with an error page
+    while :param status: is not 200. Counts the requests and their connections.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _StubHandler)
+        self.status = 200
+        self.paths: list[str] = []
+        self.connections: set[int] = set()
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}/img/"
+
+
+class _StubHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.paths.append(self.path)
+            self.server.connections.add(self.client_address[1])
+        if self.server.status == 200:
+            body = b"\x89PNG" + self.path.encode("ascii")
+            content_type = "image/png"
+        else:
+            body = b"<html>syntax error</html>"
+            content_type = "text/html"
+        self.send_response(self.server.status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def plantuml_server():
+    server = StubPlantUMLServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _render(url: str, out_dir: str, sources: list[str], cache_dir: str = None):
+    renderer = PlantUMLRenderer(url, cache_dir)
+    for index, source in enumerate(sources):
+        renderer.add(os.path.join(out_dir, f"project-view{index}"), source)
+    renderer.render()
+    return renderer
+
+
+def _source(index: int) -> str:
+    return f"@startuml\ntitle view {index}\n@enduml"
+
+
+def _read(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_identical_sources_are_requested_once(plantuml_server, tmp_path):
+    # Every other view has the same diagram as the one before it
+    sources = [_source(index // 2) for index in range(20)]
+    renderer = _render(plantuml_server.url, tmp_path, sources)
+
+    assert len(plantuml_server.paths) == 10
+    assert renderer.rendered == 10
+    # The requests share the kept-alive connections of the session
+    assert len(plantuml_server.connections) <= DEFAULT_CONNECTIONS
+    for index in range(0, 20, 2):
+        first, second = [
+            _read(os.path.join(tmp_path, f"project-view{index + offset}.png"))
+            for offset in (0, 1)
+        ]
+        assert first == second
+
+
+def test_cached_images_are_not_requested(plantuml_server, tmp_path):
+    cache_dir = os.path.join(tmp_path, "cache")
+    sources = [_source(0), _source(1)]
+    _render(plantuml_server.url, os.path.join(tmp_path, "first"), sources, cache_dir)
+    requests = len(plantuml_server.paths)
+
+    out_dir = os.path.join(tmp_path, "second")
+    renderer = _render(plantuml_server.url, out_dir, sources, cache_dir)
+
+    assert len(plantuml_server.paths) == requests
+    assert (renderer.rendered, renderer.cached) == (0, 2)
+    for index in range(2):
+        image = f"project-view{index}.png"
+        assert _read(os.path.join(out_dir, image)) == _read(
+            os.path.join(tmp_path, "first", image)
+        )
+
+
+def test_cache_key_depends_on_server_url(plantuml_server, tmp_path):
+    cache_dir = os.path.join(tmp_path, "cache")
+    other_url = plantuml_server.url.replace("127.0.0.1", "localhost")
+    assert PlantUMLRenderer(plantuml_server.url).key(_source(0)) != PlantUMLRenderer(
+        other_url
+    ).key(_source(0))
+
+    _render(plantuml_server.url, tmp_path, [_source(0)], cache_dir)
+    renderer = _render(other_url, tmp_path, [_source(0)], cache_dir)
+
+    assert len(plantuml_server.paths) == 2
+    assert (renderer.rendered, renderer.cached) == (1, 0)
+
+
+def test_error_response_replaces_stale_image(plantuml_server, tmp_path):
+    _render(plantuml_server.url, tmp_path, [_source(0)])
+    image = os.path.join(tmp_path, "project-view0.png")
+    assert os.path.exists(image)
+
+    plantuml_server.status = 400
+    renderer = _render(plantuml_server.url, tmp_path, [_source(0)])
+
+    assert renderer.failed == 1
+    assert not os.path.exists(image)
+    error_page = os.path.join(tmp_path, "project-view0_error.html")
+    assert _read(error_page) == b"<html>syntax error</html>"
@@ -0,0 +1,50 @@
+"""
+Keeps `archlens --help` fast: the heavy dependencies are only imported by the commands
+that use them, and the fastest of a few runs in fresh interpreters stays within a budget.
+"""
+import subprocess
+import sys
+import time
+
+from conftest import PYTHON_ROOT
+
+# Seconds, a few times what the command takes without the heavy imports
+BUDGET = 0.5
+RUNS = 5
+
+HEAVY_MODULES = [
+    "astroid",
+    "git",
+    "requests",
+    "jsonschema",
+    "src.core.bt_graph",
+    "src.views.view_manager",
+]
+
+RUN_HELP = (
+    "import sys; sys.argv = ['archlens', '--help']; "
+    "from src.cli_interface import main; main()"
+)
+LIST_MODULES = "import sys, src.cli_interface; print('\\n'.join(sys.modules))"
+
+
+def _run_python(code: str) -> str:
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=PYTHON_ROOT, capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+
+def test_heavy_modules_are_not_imported_at_startup():
+    loaded_modules = set(_run_python(LIST_MODULES).split())
+    assert [module for module in HEAVY_MODULES if module in loaded_modules] == []
+
+
+def test_help_within_budget():
+    durations = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        _run_python(RUN_HELP)
+        durations.append(time.perf_counter() - start)
+    assert min(durations) <= BUDGET